@@ -1,13 +1,79 @@
 """
 MCP Tutorial - Section 1: Environment Setup
 This script checks if your environment is properly set up for the MCP tutorial.
+
+Each package is imported in its own subprocess, so the import time and
+memory footprint of every package can be measured from a cold interpreter.
+The probes run concurrently unless --serial is given. Packages that exceed
+the startup budget are flagged and the script exits with a non-zero status,
+so it can be used as a startup-regression gate.
 """
 
+import argparse
 import importlib.util
+import json
 import os
 import platform
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Default startup budgets for a single package import
+DEFAULT_IMPORT_BUDGET_MS = 1000.0
+DEFAULT_MEMORY_BUDGET_MB = 100.0
+
+# Seconds to wait for a single import probe
+PROBE_TIMEOUT = 60
+
+# Code run in a fresh interpreter to import a package and its components.
+# It prints a single JSON object describing the result.
+PROBE_CODE = """
+import importlib, json, sys, time
+try:
+    import resource
+except ImportError:
+    resource = None
+
+def max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+package, components = sys.argv[1], sys.argv[2:]
+result = {"package": package, "components": {}}
+rss_before = max_rss_kb()
+start = time.perf_counter()
+try:
+    module = importlib.import_module(package)
+    result["ok"] = True
+    result["version"] = getattr(module, "__version__", "unknown")
+except Exception as e:
+    result["ok"] = False
+    result["error"] = f"{type(e).__name__}: {e}"
+
+if result["ok"]:
+    for component in components:
+        module_name, _, attribute = component.partition(":")
+        try:
+            getattr(importlib.import_module(module_name), attribute)
+            result["components"][component] = None
+        except Exception as e:
+            result["components"][component] = f"{type(e).__name__}: {e}"
+# The import time covers the package and its components, as a server imports them
+result["import_ms"] = (time.perf_counter() - start) * 1000
+
+rss_after = max_rss_kb()
+if rss_before is not None:
+    result["rss_kb"] = rss_after
+    result["rss_delta_kb"] = rss_after - rss_before
+print(json.dumps(result))
+"""
+
+# MCP components that must be importable, as "module:attribute"
+MCP_SERVER_COMPONENT = "mcp.server.fastmcp:FastMCP"
+MCP_CLIENT_COMPONENT = "mcp:ClientSession"
 
 
 def check_python_version():
@@ -23,55 +89,105 @@ def check_python_version():
         return False
 
 
-def check_package_installed(package_name):
-    """Check if a package is installed."""
-    spec = importlib.util.find_spec(package_name)
-    if spec is not None:
-        try:
-            module = importlib.import_module(package_name)
-            version = getattr(module, "__version__", "unknown")
-            print(f"✅ {package_name} is installed (version: {version})")
-            return True
-        except ImportError:
-            print(f"❌ {package_name} is installed but failed to import")
-            return False
-    else:
-        print(f"❌ {package_name} is not installed")
-        return False
+def probe_package(package_name, components=()):
+    """
+    Import a package (and optional components) in a fresh interpreter.
 
+    Args:
+        package_name: The name of the package to import
+        components: "module:attribute" names to import after the package
+
+    Returns:
+        A dictionary with the import status, version, timings and memory usage
+    """
+    if importlib.util.find_spec(package_name) is None:
+        return {"package": package_name, "ok": False, "missing": True}
 
-def check_mcp_package():
-    """Check if the MCP package is installed and working."""
     try:
-        # Try to import mcp (without needing __version__)
-        import mcp
+        completed = subprocess.run(
+            [sys.executable, "-c", PROBE_CODE, package_name, *components],
+            capture_output=True,
+            text=True,
+            timeout=PROBE_TIMEOUT,
+        )
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    except subprocess.TimeoutExpired:
+        error = f"import did not finish within {PROBE_TIMEOUT} seconds"
+    except (IndexError, json.JSONDecodeError):
+        error = completed.stderr.strip() or "probe produced no result"
+    return {"package": package_name, "ok": False, "error": error}
 
-        try:
-            from mcp import __version__
 
-            print(f"✅ MCP package is installed (version: {__version__})")
-        except ImportError:
-            print("✅ MCP package is installed (version: unknown)")
+def format_footprint(result):
+    """Format the import time and memory footprint of a probe result."""
+    parts = [f"import: {result['import_ms']:.0f} ms"]
+    if "rss_delta_kb" in result:
+        parts.append(f"memory: +{result['rss_delta_kb'] / 1024:.1f} MB")
+        parts.append(f"process: {result['rss_kb'] / 1024:.1f} MB")
+    return ", ".join(parts)
 
-        # Try importing key components
-        try:
-            from mcp.server.fastmcp import FastMCP
 
-            print("✅ MCP server components are available")
-        except ImportError as e:
-            print(f"⚠️ MCP server components error: {e}")
+def check_budget(result, import_budget_ms, memory_budget_mb):
+    """Check a probe result against the startup budget, reporting overruns."""
+    within_budget = True
+    if result["import_ms"] > import_budget_ms:
+        print(
+            f"   ⚠️ {result['package']} took {result['import_ms']:.0f} ms to import "
+            f"(budget: {import_budget_ms:.0f} ms)"
+        )
+        within_budget = False
+    memory_mb = result.get("rss_delta_kb", 0) / 1024
+    if memory_mb > memory_budget_mb:
+        print(
+            f"   ⚠️ {result['package']} added {memory_mb:.1f} MB of memory "
+            f"(budget: {memory_budget_mb:.0f} MB)"
+        )
+        within_budget = False
+    return within_budget
 
-        try:
-            from mcp import ClientSession
 
-            print("✅ MCP client components are available")
-            return True
-        except ImportError as e:
-            print(f"❌ MCP client components error: {e}")
-            return False
+def check_package_installed(result):
+    """Report whether a probed package is installed."""
+    package_name = result["package"]
+    if result.get("missing"):
+        print(f"❌ {package_name} is not installed")
+        return False
+    if not result["ok"]:
+        print(f"❌ {package_name} is installed but failed to import")
+        if result.get("error"):
+            print(f"   {result['error']}")
+        return False
+
+    print(
+        f"✅ {package_name} is installed (version: {result['version']}, "
+        f"{format_footprint(result)})"
+    )
+    return True
+
+
+def check_mcp_package(result):
+    """Report whether the MCP package is installed and working."""
+    if result.get("missing") or not result["ok"]:
+        print(f"❌ MCP package error: {result.get('error', 'mcp is not installed')}")
+        return False
+
+    print(
+        f"✅ MCP package is installed (version: {result['version']}, "
+        f"{format_footprint(result)})"
+    )
+
+    server_error = result["components"].get(MCP_SERVER_COMPONENT)
+    if server_error is None:
+        print("✅ MCP server components are available")
+    else:
+        print(f"⚠️ MCP server components error: {server_error}")
 
-    except ImportError as e:
-        print(f"❌ MCP package error: {e}")
+    client_error = result["components"].get(MCP_CLIENT_COMPONENT)
+    if client_error is None:
+        print("✅ MCP client components are available")
+        return True
+    else:
+        print(f"❌ MCP client components error: {client_error}")
         return False
 
 
@@ -86,28 +202,79 @@ def check_os_compatibility():
         return False
 
 
+def parse_args():
+    """Parse the command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Check environment setup for the MCP tutorial."
+    )
+    parser.add_argument(
+        "--import-budget-ms",
+        type=float,
+        default=float(os.environ.get("MCP_IMPORT_BUDGET_MS", DEFAULT_IMPORT_BUDGET_MS)),
+        help="Maximum import time of a single package in milliseconds",
+    )
+    parser.add_argument(
+        "--memory-budget-mb",
+        type=float,
+        default=float(os.environ.get("MCP_MEMORY_BUDGET_MB", DEFAULT_MEMORY_BUDGET_MB)),
+        help="Maximum memory added by importing a single package in megabytes",
+    )
+    parser.add_argument(
+        "--serial",
+        action="store_true",
+        help=(
+            "Run one probe at a time, for import times free of CPU and disk "
+            "contention"
+        ),
+    )
+    return parser.parse_args()
+
+
 def main():
     """Check environment setup for MCP tutorial."""
+    args = parse_args()
     print("==== MCP Tutorial Environment Check ====\n")
 
     # Check Python version
     python_ok = check_python_version()
 
+    # Probe the essential packages and MCP concurrently, each in its own process
+    essential_packages = ["asyncio", "typing", "pydantic", "fastapi", "aiohttp"]
+    # Concurrent probes still compete for disk and CPU caches, which inflates
+    # their import times; --serial measures them one at a time instead
+    max_workers = 1 if args.serial else os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        package_futures = [
+            executor.submit(probe_package, package) for package in essential_packages
+        ]
+        mcp_future = executor.submit(
+            probe_package, "mcp", (MCP_SERVER_COMPONENT, MCP_CLIENT_COMPONENT)
+        )
+        package_results = [future.result() for future in package_futures]
+        mcp_result = mcp_future.result()
+
     # Check essential packages
     packages_ok = True
-    essential_packages = ["asyncio", "typing", "pydantic", "fastapi", "aiohttp"]
-    for package in essential_packages:
-        if not check_package_installed(package):
+    for result in package_results:
+        if not check_package_installed(result):
             packages_ok = False
 
     # Check MCP package
-    mcp_ok = check_mcp_package()
+    mcp_ok = check_mcp_package(mcp_result)
+
+    # Check the startup budget of every package that imported successfully
+    budget_ok = True
+    for result in package_results + [mcp_result]:
+        if result["ok"] and not check_budget(
+            result, args.import_budget_ms, args.memory_budget_mb
+        ):
+            budget_ok = False
 
     # Check OS compatibility
     os_ok = check_os_compatibility()
 
     print("\n===== Summary =====")
-    if all([python_ok, packages_ok, mcp_ok, os_ok]):
+    if all([python_ok, packages_ok, mcp_ok, os_ok, budget_ok]):
         print("✅ Your environment is ready for the MCP tutorial!")
     else:
         print("⚠️ Please fix the issues above before continuing with the tutorial.")
@@ -117,10 +284,17 @@ def main():
             print("\nYou can install missing packages with:")
             print("pip install -r requirements.txt")
 
+        if not budget_ok:
+            print(
+                "\nSome packages exceed the startup budget "
+                f"({args.import_budget_ms:.0f} ms, {args.memory_budget_mb:.0f} MB)."
+            )
+
     print(
         "\nFor more information about MCP, visit: https://github.com/anthropics/anthropic-tools"
     )
+    return all([python_ok, packages_ok, mcp_ok, os_ok, budget_ok])
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(0 if main() else 1)
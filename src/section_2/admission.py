@@ -0,0 +1,162 @@
+"""
+MCP Tutorial - Section 2: Admission Control
+This module demonstrates how a server can bound the work it accepts: a
+concurrency limit with a bounded wait queue for the whole server and for
+each tool, and payload size limits checked before a tool does any work.
+"""
+
+import asyncio
+import functools
+import logging
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+
+from common import ToolFn
+
+logger = logging.getLogger(__name__)
+
+
+class ServerOverloadedError(Exception):
+    """Raised when a tool call is rejected because the server is overloaded."""
+
+
+class PayloadTooLargeError(ValueError):
+    """Raised when the arguments of a tool call exceed the allowed size."""
+
+
+class ConcurrencyLimiter:
+    """
+    Limit the number of concurrent calls, with a bounded queue of waiters.
+
+    Calls that arrive while all slots are busy wait in the queue; once the
+    queue is full they are rejected immediately instead of piling up.
+    """
+
+    def __init__(self, name: str, max_concurrent: int, max_queued: int):
+        """
+        Create a concurrency limiter.
+
+        Args:
+            name: Name used in error messages
+            max_concurrent: Maximum number of calls running at the same time
+            max_queued: Maximum number of calls waiting for a slot
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """Hold a slot for the duration of the block, or reject if overloaded."""
+        if self._semaphore.locked() and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise ServerOverloadedError(
+                f"{self.name} is overloaded ({self.active} running, "
+                f"{self.queued} queued), please retry later"
+            )
+
+        self.queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+
+def payload_size(value: Any) -> int:
+    """
+    Estimate the size of a deserialized argument value.
+
+    Strings and bytes count their length, containers the sum of their items,
+    and every other value a small constant.
+    """
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(payload_size(k) + payload_size(v) for k, v in value.items())
+    if isinstance(value, (list, tuple, set)):
+        return sum(payload_size(item) for item in value) + len(value)
+    return 8
+
+
+class AdmissionController:
+    """Apply server-wide and per-tool admission limits to tool functions."""
+
+    def __init__(self, max_concurrent: int = 32, max_queued: int = 64):
+        """
+        Create an admission controller.
+
+        Args:
+            max_concurrent: Maximum number of tool calls running server-wide
+            max_queued: Maximum number of tool calls waiting server-wide
+        """
+        self.server_limiter = ConcurrencyLimiter("Server", max_concurrent, max_queued)
+        self.tool_limiters: Dict[str, ConcurrencyLimiter] = {}
+
+    def limit(
+        self,
+        max_concurrent: Optional[int] = None,
+        max_queued: int = 0,
+        max_payload: Optional[int] = None,
+    ) -> Callable[[ToolFn], ToolFn]:
+        """
+        Decorate a tool function with admission limits.
+
+        Apply it below `@server.tool()` so FastMCP registers the limited
+        function; the original signature and docstring are preserved.
+
+        Args:
+            max_concurrent: Maximum concurrent calls of this tool (None: no limit)
+            max_queued: Maximum calls of this tool waiting for a slot
+            max_payload: Maximum estimated size of the arguments (None: no limit)
+
+        Returns:
+            A decorator for the tool function
+        """
+
+        def decorator(fn: ToolFn) -> ToolFn:
+            tool_name = fn.__name__
+            tool_limiter = None
+            if max_concurrent is not None:
+                tool_limiter = ConcurrencyLimiter(
+                    f"Tool '{tool_name}'", max_concurrent, max_queued
+                )
+                self.tool_limiters[tool_name] = tool_limiter
+
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                # Reject oversized payloads before taking a slot or doing any work
+                if max_payload is not None:
+                    size = payload_size(list(kwargs.values())) + payload_size(args)
+                    if size > max_payload:
+                        logger.warning(
+                            f"Rejected {tool_name} call with payload of {size} "
+                            f"(limit: {max_payload})"
+                        )
+                        raise PayloadTooLargeError(
+                            f"Payload of {size} exceeds the limit of {max_payload} "
+                            f"for tool '{tool_name}'"
+                        )
+
+                # Take the tool slot first so a call waiting for a busy tool
+                # doesn't hold a server-wide slot
+                if tool_limiter is None:
+                    async with self.server_limiter.acquire():
+                        return await fn(*args, **kwargs)
+                async with tool_limiter.acquire():
+                    async with self.server_limiter.acquire():
+                        return await fn(*args, **kwargs)
+
+            return wrapper  # type: ignore[return-value]
+
+        return decorator
@@ -7,7 +7,13 @@ import asyncio
 import logging
 from typing import Any, Dict, List, Union
 
+from admission import AdmissionController
 from mcp.server.fastmcp import FastMCP
+from payload_encoding import encode_payload
+from profiling import ToolProfiler
+from stdio_transport import run_stdio
+from tracing import Tracer
+from traffic_capture import TrafficRecorder
 
 # Configure logging
 logging.basicConfig(
@@ -16,6 +22,21 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Admission limits: server-wide concurrency and wait queue
+MAX_CONCURRENT_CALLS = 32
+MAX_QUEUED_CALLS = 64
+
+# Largest payloads accepted by the echo and sort_list tools
+MAX_ECHO_PAYLOAD = 16 * 1024 * 1024
+MAX_SORT_PAYLOAD = 1024 * 1024
+
+# Largest request line read from stdin: the largest payload plus room for
+# the JSON-RPC envelope. Longer requests are rejected before being parsed.
+MAX_REQUEST_BYTES = MAX_ECHO_PAYLOAD + 1024 * 1024
+
+# Longest echoed text logged in full
+MAX_LOGGED_TEXT = 200
+
 
 async def main():
     """
@@ -26,23 +47,53 @@ async def main():
     # Initialize the MCP server with a name
     server = FastMCP("Basic MCP Server")
 
+    # Bound the work the server accepts so that floods degrade gracefully
+    admission = AdmissionController(
+        max_concurrent=MAX_CONCURRENT_CALLS, max_queued=MAX_QUEUED_CALLS
+    )
+
+    # Profile every tool invocation when MCP_PROFILE_DIR is set
+    profiler = ToolProfiler.from_env()
+
+    # Trace the latency breakdown of tool calls when MCP_TRACE_FILE is set
+    tracer = Tracer.from_env("basic_server")
+
     # Register an echo tool
     @server.tool()
-    async def echo(text: str) -> str:
+    @tracer.trace
+    @profiler.profile
+    @admission.limit(max_payload=MAX_ECHO_PAYLOAD)
+    async def echo(
+        text: str, chunk_size: int = 0, accept_encoding: str = ""
+    ) -> Union[str, List[str]]:
         """
         Echo back the input text.
 
         Args:
             text: The text to echo back
+            chunk_size: Split the text into chunks of at most this many
+                characters (default: 0, no chunking)
+            accept_encoding: Compression encodings accepted for large texts,
+                such as "zstd, zlib" (default: no compression)
 
         Returns:
-            The same text that was provided
+            The same text that was provided, or a JSON header followed by the
+            chunks when it is chunked or compressed
         """
-        logger.info(f"Echoing: {text}")
-        return text
+        if len(text) <= MAX_LOGGED_TEXT:
+            logger.info(f"Echoing: {text}")
+        else:
+            logger.info(f"Echoing {len(text)} characters")
+
+        if chunk_size < 0:
+            raise ValueError("chunk_size must be 0 or positive")
+        return encode_payload(text, chunk_size, accept_encoding)
 
     # Register an add_numbers tool
     @server.tool()
+    @tracer.trace
+    @profiler.profile
+    @admission.limit()
     async def add_numbers(a: float, b: float) -> Dict[str, float]:
         """
         Add two numbers together.
@@ -60,6 +111,9 @@ async def main():
 
     # Register a sort_list tool
     @server.tool()
+    @tracer.trace
+    @profiler.profile
+    @admission.limit(max_concurrent=4, max_queued=16, max_payload=MAX_SORT_PAYLOAD)
     async def sort_list(items: List[str], reverse: bool = False) -> List[str]:
         """
         Sort a list of strings.
@@ -76,7 +130,13 @@ async def main():
 
     # Run the server using stdio
     logger.info("Server started. Running with stdio communication.")
-    await server.run_stdio_async()
+    # Set MCP_TRAFFIC_LOG to record every JSON-RPC message
+    await run_stdio(
+        server,
+        recorder=TrafficRecorder.from_env("server"),
+        observer=tracer.server_observer(),
+        max_request_bytes=MAX_REQUEST_BYTES,
+    )
 
 
 if __name__ == "__main__":
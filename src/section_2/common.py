@@ -0,0 +1,127 @@
+"""
+MCP Tutorial - Section 2: Shared Helpers
+Helpers used by several of the section 2 modules: the type of decorated tool
+functions, a percentile over latency samples, the setup of the server
+session pool shared by both clients, and tool calls carrying request metadata.
+"""
+
+import logging
+import os
+from contextlib import AsyncExitStack
+from datetime import timedelta
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from mcp import ClientSession, types
+from mcp.client.stdio import StdioServerParameters, get_default_environment
+
+logger = logging.getLogger(__name__)
+
+ToolFn = TypeVar("ToolFn", bound=Callable[..., Awaitable[Any]])
+
+# Number of server sessions the clients connect, so slow calls can be hedged
+SESSION_POOL_SIZE = 2
+
+
+def percentile(values: Iterable[float], q: float) -> float:
+    """
+    Return the q-th percentile (0-1) of some values.
+
+    Raises:
+        ValueError: If there are no values
+    """
+    ordered = sorted(values)
+    if not ordered:
+        raise ValueError("percentile of no values")
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def server_environment() -> Dict[str, str]:
+    """Build the server environment, forwarding MCP_* settings such as MCP_PROFILE_DIR."""
+    env = get_default_environment()
+    env.update({k: v for k, v in os.environ.items() if k.startswith("MCP_")})
+    return env
+
+
+async def connect_session_pool(
+    exit_stack: AsyncExitStack,
+    server_params: StdioServerParameters,
+    tracer: Any,
+    recorder: Optional[Any] = None,
+    size: int = SESSION_POOL_SIZE,
+    read_timeout_seconds: float = 30.0,
+) -> List[Any]:
+    """
+    Start and initialize a pool of sessions to a server.
+
+    Args:
+        exit_stack: The exit stack closing the sessions and their transports
+        server_params: The server to start, once per session
+        tracer: The Tracer whose transport and sessions are used
+        recorder: A TrafficRecorder recording every message, if any
+        size: The number of sessions
+        read_timeout_seconds: Session timeout, only a hard ceiling since
+            AdaptiveSession derives tighter per-tool timeouts
+
+    Returns:
+        The initialized sessions, wrapped by the tracer
+    """
+    sessions = []
+    for _ in range(size):
+        read_stream, write_stream = await exit_stack.enter_async_context(
+            tracer.stdio_client(server_params)
+        )
+        if recorder is not None:
+            read_stream, write_stream = recorder.wrap(read_stream, write_stream)
+
+        session = await exit_stack.enter_async_context(
+            ClientSession(
+                read_stream,
+                write_stream,
+                read_timeout_seconds=timedelta(seconds=read_timeout_seconds),
+            )
+        )
+
+        # IMPORTANT: Initialize the session before making any tool calls
+        logger.info("Initializing the client session...")
+        await session.initialize()
+        sessions.append(tracer.wrap_session(session))
+    return sessions
+
+
+async def call_tool_with_meta(
+    session: Any,
+    name: str,
+    arguments: Optional[Dict[str, Any]] = None,
+    meta: Optional[Dict[str, Any]] = None,
+) -> types.CallToolResult:
+    """
+    Call a tool, adding fields to the _meta of the request.
+
+    ClientSession.call_tool has no way to set _meta, so the request is built
+    here for plain sessions. Wrappers such as TracedSession take a meta
+    argument instead.
+
+    Args:
+        session: The session to call the tool on
+        name: The name of the tool
+        arguments: The tool arguments
+        meta: The fields to add to the request's _meta
+
+    Returns:
+        The tool result
+    """
+    if not meta:
+        return await session.call_tool(name, arguments)
+    if not isinstance(session, ClientSession):
+        return await session.call_tool(name, arguments, meta=meta)
+    request = types.ClientRequest(
+        types.CallToolRequest(
+            method="tools/call",
+            params=types.CallToolRequestParams(
+                name=name,
+                arguments=arguments,
+                _meta=types.RequestParams.Meta(**meta),
+            ),
+        )
+    )
+    return await session.send_request(request, types.CallToolResult)
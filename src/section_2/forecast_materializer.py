@@ -0,0 +1,230 @@
+"""
+MCP Tutorial - Section 2: Forecast Materialization
+This module demonstrates how to precompute tool results in the background so
+that tool calls become simple lookups. A ForecastMaterializer keeps the full
+forecast of every city in memory:
+
+- When it starts and whenever the day rolls over, it rebuilds every city
+  with one bulk fetch from the forecast provider.
+- In between, it refreshes one city at a time, round-robin, so that each
+  city is refreshed once per refresh period without bursts of upstream load.
+
+Every refresh is timed, and stats() reports how fresh each city is.
+
+With a SharedForecastStore, the server processes of a host share the work:
+the one holding the store's writer claim (the leader) materializes into the
+store, and the others (followers) serve lookups from it. Followers retry the
+claim every refresh period, so one of them takes over if the leader exits.
+"""
+
+import asyncio
+import logging
+import time
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from forecast_provider import CityWeather, ForecastProvider
+from shared_forecasts import SharedForecastStore
+
+logger = logging.getLogger(__name__)
+
+
+class ForecastMaterializer:
+    """Precompute the forecasts of a fixed set of cities in the background."""
+
+    def __init__(
+        self,
+        provider: ForecastProvider,
+        cities: List[str],
+        refresh_seconds: float = 60.0,
+        shared_store: Optional[SharedForecastStore] = None,
+    ):
+        """
+        Create a forecast materializer.
+
+        Args:
+            provider: The upstream forecast provider
+            cities: The cities to materialize
+            refresh_seconds: How often each city is refreshed
+            shared_store: Store shared with the other server processes on
+                this host, materialized into by one of them only
+        """
+        self.provider = provider
+        self.cities = list(cities)
+        self.refresh_seconds = refresh_seconds
+        self.shared_store = shared_store
+        self.generation = 0
+        self.day: Optional[date] = None
+        self.last_build: Optional[Dict[str, Any]] = None
+        self._weather: Dict[str, CityWeather] = {}
+        self._refreshed: Dict[str, Dict[str, float]] = {}
+        self._next_city = 0
+        self._task: Optional["asyncio.Task[None]"] = None
+
+    @property
+    def role(self) -> str:
+        """The role of this process: "private", "leader" or "follower"."""
+        if self.shared_store is None:
+            return "private"
+        return "leader" if self.shared_store.is_writer else "follower"
+
+    @property
+    def max_shared_age(self) -> float:
+        """Age after which shared forecasts are ignored, e.g. if the leader died."""
+        return 2 * self.refresh_seconds
+
+    def lookup(self, city: str) -> Optional[CityWeather]:
+        """
+        Get the materialized weather of a city.
+
+        Returns:
+            The city weather, or None if the city hasn't been materialized.
+            Forecasts read from a shared store only have the city's "days".
+        """
+        if self.shared_store is None:
+            return self._weather.get(city)
+        days = self.shared_store.read(city, max_age=self.max_shared_age)
+        return {"city": city, "days": days} if days else None
+
+    async def start(self) -> None:
+        """Build every city once, then keep them fresh in the background."""
+        if self.shared_store is None or self.shared_store.claim_writer():
+            await self.build()
+        else:
+            logger.info("Another process materializes the shared forecasts")
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def build(self) -> None:
+        """Rebuild every city with one bulk fetch."""
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            fetched = await self.provider.fetch(self.cities)
+        except Exception as e:
+            logger.error(f"Materializing {len(self.cities)} cities failed: {e}")
+            return
+        duration = time.perf_counter() - start
+
+        if self.shared_store is not None:
+            # A full rebuild (startup, day rollover or a new leader) replaces
+            # every city: drop whatever the previous build left for the
+            # cities missing from this one
+            self.shared_store.invalidate()
+        stored = sum(
+            self._store(city, weather, started_at, duration)
+            for city, weather in fetched.items()
+        )
+        self.generation += 1
+        self.day = date.today()
+        self.last_build = {
+            "started_at": started_at,
+            "duration_ms": round(duration * 1000, 3),
+            "cities": stored,
+        }
+        logger.info(
+            f"Materialized {stored} of {len(fetched)} cities in "
+            f"{duration * 1000:.1f} ms (generation {self.generation})"
+        )
+
+    async def refresh(self, city: str) -> None:
+        """Refresh a single city."""
+        started_at = time.time()
+        start = time.perf_counter()
+        try:
+            fetched = await self.provider.fetch([city])
+        except Exception as e:
+            logger.warning(f"Refreshing {city} failed: {e}")
+            return
+        if city in fetched:
+            self._store(city, fetched[city], started_at, time.perf_counter() - start)
+
+    def _store(
+        self, city: str, weather: CityWeather, started_at: float, duration: float
+    ) -> bool:
+        """
+        Swap in the new weather of a city and record when it was refreshed.
+
+        Returns:
+            True if the weather was stored; failures are logged, so that one
+            malformed upstream answer can't stop the background refresh
+        """
+        try:
+            if self.shared_store is None:
+                self._weather[city] = weather
+            elif not self.shared_store.write(city, weather["days"]):
+                logger.warning(f"The forecast of {city} doesn't fit the shared store")
+                return False
+        except Exception as e:
+            logger.error(f"Storing the forecast of {city} failed: {e}")
+            return False
+        self._refreshed[city] = {"refreshed_at": started_at, "duration": duration}
+        return True
+
+    async def _run(self) -> None:
+        """Rebuild on day rollover, otherwise refresh cities round-robin."""
+        interval = self.refresh_seconds / max(1, len(self.cities))
+        while True:
+            if self.role == "follower":
+                await asyncio.sleep(self.refresh_seconds)
+            else:
+                await asyncio.sleep(interval)
+            try:
+                await self._step()
+            except Exception as e:
+                # Keep refreshing: a dead task would let every forecast age out
+                logger.error(f"Forecast materialization step failed: {e}")
+
+    async def _step(self) -> None:
+        """Take over if the leader left, rebuild on day rollover, or refresh a city."""
+        if self.role == "follower":
+            if self.shared_store is not None and self.shared_store.claim_writer():
+                logger.info("Took over materializing the shared forecasts")
+                await self.build()
+            return
+        if date.today() != self.day:
+            await self.build()
+            return
+        city = self.cities[self._next_city]
+        self._next_city = (self._next_city + 1) % len(self.cities)
+        await self.refresh(city)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Report the freshness and timing of the materialized forecasts.
+
+        Returns:
+            The role of this process, its generation and last full build (a
+            follower has none) and, per city, the age of its forecast and,
+            when refreshed by this process, how long the refresh took
+        """
+        now = time.time()
+        cities: Dict[str, Dict[str, float]] = {}
+        for city in self.cities:
+            refreshed = self._refreshed.get(city)
+            if self.shared_store is not None:
+                refreshed_at = self.shared_store.fetched_at(city)
+            else:
+                refreshed_at = refreshed["refreshed_at"] if refreshed else None
+            if refreshed_at is None:
+                continue
+            cities[city] = {"age_seconds": round(now - refreshed_at, 3)}
+            if refreshed is not None:
+                cities[city]["refresh_ms"] = round(refreshed["duration"] * 1000, 3)
+        return {
+            "role": self.role,
+            "generation": self.generation,
+            "day": self.day.isoformat() if self.day else None,
+            "refresh_seconds": self.refresh_seconds,
+            "last_build": self.last_build,
+            "cities": cities,
+        }
+
+    async def close(self) -> None:
+        """Stop the background refresh."""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
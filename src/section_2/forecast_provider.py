@@ -0,0 +1,600 @@
+"""
+MCP Tutorial - Section 2: Forecast Data Providers
+This module demonstrates how to put the weather tools in front of an
+upstream forecast source without paying one upstream request per tool call:
+
+- ForecastProvider: the upstream source interface, fetching several cities at once
+- SyntheticForecastProvider: generates random forecasts in-process
+- HttpForecastProvider: fetches forecasts over HTTP, through a pooled aiohttp
+  session by default
+- FakeForecastServer: a local HTTP stand-in for the upstream service
+- BatchLoader: batches the lookups made within a short window into one fetch
+- ForecastService: a stale-while-revalidate cache on top of a BatchLoader
+
+Run this module to benchmark one fetch per lookup (with a new connection each
+time, then through a pooled session) against batched lookups on the fake
+server, or to serve the fake upstream for weather_server.py:
+
+    python src/section_2/forecast_provider.py
+    python src/section_2/forecast_provider.py --serve --port 8765
+    MCP_FORECAST_URL=http://127.0.0.1:8765 python src/section_2/weather_client.py
+"""
+
+import argparse
+import asyncio
+import logging
+import os
+import random
+import time
+import weakref
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+try:
+    import aiohttp
+    from aiohttp import web
+except ImportError:  # aiohttp is only needed for the HTTP provider
+    aiohttp = None
+    web = None
+
+logger = logging.getLogger(__name__)
+
+# Environment variable naming the base URL of an HTTP forecast service
+FORECAST_URL_ENV = "MCP_FORECAST_URL"
+
+# Number of days every upstream forecast covers
+FORECAST_DAYS = 10
+
+# Define weather conditions
+WEATHER_CONDITIONS = [
+    "sunny",
+    "partly cloudy",
+    "cloudy",
+    "rainy",
+    "thunderstorm",
+    "snowy",
+    "foggy",
+    "windy",
+    "hail",
+]
+
+# Define cities with base temperatures
+CITIES = {
+    "New York": {"base_temp_c": 15, "precipitation_chance": 30},
+    "London": {"base_temp_c": 12, "precipitation_chance": 60},
+    "Tokyo": {"base_temp_c": 20, "precipitation_chance": 40},
+    "Sydney": {"base_temp_c": 25, "precipitation_chance": 20},
+    "Paris": {"base_temp_c": 18, "precipitation_chance": 35},
+    "Cairo": {"base_temp_c": 30, "precipitation_chance": 5},
+    "Moscow": {"base_temp_c": 5, "precipitation_chance": 25},
+    "Rio de Janeiro": {"base_temp_c": 27, "precipitation_chance": 15},
+}
+
+CityWeather = Dict[str, Any]
+
+
+def get_weather_condition(precipitation_chance: int) -> str:
+    """Get a weather condition based on precipitation chance."""
+    if precipitation_chance < 10:
+        return random.choice(["sunny", "sunny", "sunny", "partly cloudy"])
+    elif precipitation_chance < 30:
+        return random.choice(["partly cloudy", "partly cloudy", "cloudy"])
+    elif precipitation_chance < 50:
+        return random.choice(["cloudy", "cloudy", "rainy"])
+    elif precipitation_chance < 70:
+        return random.choice(["rainy", "rainy", "thunderstorm"])
+    else:
+        return random.choice(["rainy", "thunderstorm", "thunderstorm"])
+
+
+def generate_city_weather(city: str) -> CityWeather:
+    """
+    Generate a synthetic forecast and alerts for a city.
+
+    Args:
+        city: The name of a city in CITIES
+
+    Returns:
+        A dictionary with the daily forecasts (temperatures in Celsius) and alerts
+    """
+    city_data = CITIES[city]
+    base_temp_c = city_data["base_temp_c"]
+    precipitation_chance = city_data["precipitation_chance"]
+
+    days = []
+    for day_offset in range(FORECAST_DAYS):
+        date = datetime.now() + timedelta(days=day_offset)
+
+        # Vary precipitation chance slightly
+        day_precipitation = max(
+            0, min(100, precipitation_chance + random.randint(-10, 10))
+        )
+
+        days.append(
+            {
+                "date": date.strftime("%Y-%m-%d"),
+                # Add some randomness to temperature
+                "temperature_c": base_temp_c + random.uniform(-5, 5),
+                "precipitation_chance": day_precipitation,
+                "condition": get_weather_condition(day_precipitation),
+            }
+        )
+
+    alerts = []
+
+    # Generate random severe weather alerts
+    if precipitation_chance > 60:
+        alerts.append(
+            {
+                "severity": "high",
+                "type": "flood",
+                "message": f"Flood warning in effect for {city} and surrounding areas",
+            }
+        )
+    elif precipitation_chance > 40:
+        alerts.append(
+            {
+                "severity": "medium",
+                "type": "rain",
+                "message": f"Heavy rain expected in {city} today",
+            }
+        )
+
+    # Add a heat alert for very hot cities
+    if base_temp_c > 28:
+        alerts.append(
+            {
+                "severity": "medium",
+                "type": "heat",
+                "message": f"Heat advisory in effect for {city}",
+            }
+        )
+
+    # Add a cold alert for very cold cities
+    if base_temp_c < 8:
+        alerts.append(
+            {
+                "severity": "medium",
+                "type": "cold",
+                "message": f"Cold weather advisory in effect for {city}",
+            }
+        )
+
+    # Sometimes return no alerts
+    if random.random() > 0.7:
+        alerts = []
+
+    return {"city": city, "days": days, "alerts": alerts}
+
+
+class ForecastProvider(ABC):
+    """An upstream forecast source that can fetch several cities at once."""
+
+    @abstractmethod
+    async def fetch(self, cities: List[str]) -> Dict[str, CityWeather]:
+        """
+        Fetch the weather of several cities.
+
+        Args:
+            cities: The names of the cities to fetch
+
+        Returns:
+            A mapping of city names to their weather; unknown cities are left out
+        """
+
+    async def close(self) -> None:
+        """Release the resources held by the provider."""
+
+
+class SyntheticForecastProvider(ForecastProvider):
+    """Generate random forecasts in-process."""
+
+    async def fetch(self, cities: List[str]) -> Dict[str, CityWeather]:
+        return {city: generate_city_weather(city) for city in cities if city in CITIES}
+
+
+class HttpForecastProvider(ForecastProvider):
+    """
+    Fetch forecasts from an HTTP service.
+
+    By default all requests go through one aiohttp session, so connections
+    to the service are pooled and kept alive between fetches. Unpooled
+    providers open a new session, and so a new connection, for every fetch.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        max_connections: int = 10,
+        timeout: float = 5.0,
+        pooled: bool = True,
+    ):
+        """
+        Create an HTTP forecast provider.
+
+        Args:
+            base_url: The base URL of the forecast service
+            max_connections: Maximum number of concurrent connections
+            timeout: Total timeout of a fetch in seconds
+            pooled: Whether to reuse one session for every fetch
+        """
+        if aiohttp is None:
+            raise ImportError(
+                "aiohttp is required for HttpForecastProvider: pip install aiohttp"
+            )
+        self.base_url = base_url.rstrip("/")
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.pooled = pooled
+        self._session: Optional["aiohttp.ClientSession"] = None
+        # Bounds unpooled fetches like the pooled connector bounds connections
+        self._connections = asyncio.Semaphore(max_connections)
+
+    def _new_session(self) -> "aiohttp.ClientSession":
+        """Create a session with its own connection pool."""
+        return aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=self.max_connections),
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        )
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """Return the pooled session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            self._session = self._new_session()
+        return self._session
+
+    async def fetch(self, cities: List[str]) -> Dict[str, CityWeather]:
+        if self.pooled:
+            return await self._get(self._get_session(), cities)
+        async with self._connections, self._new_session() as session:
+            return await self._get(session, cities)
+
+    async def _get(
+        self, session: "aiohttp.ClientSession", cities: List[str]
+    ) -> Dict[str, CityWeather]:
+        """Request the weather of some cities through a session."""
+        params = [("city", city) for city in cities]
+        async with session.get(f"{self.base_url}/forecast", params=params) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+
+class FakeForecastServer:
+    """
+    A local HTTP stand-in for an upstream forecast service.
+
+    It serves synthetic forecasts at GET /forecast?city=...&city=... and
+    counts requests and connections, so batching and pooling can be tested
+    and benchmarked without network access.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0):
+        """
+        Create a fake forecast server.
+
+        Args:
+            host: The interface to listen on
+            port: The port to listen on (0: pick a free port)
+            latency: Artificial delay added to every response, in seconds
+        """
+        if web is None:
+            raise ImportError(
+                "aiohttp is required for FakeForecastServer: pip install aiohttp"
+            )
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.requests = 0
+        self.cities_served = 0
+        self.connections = 0
+        # Transports already counted; weak so closed ones can't be mistaken
+        # for new connections that reuse their id
+        self._transports: "weakref.WeakSet[Any]" = weakref.WeakSet()
+        self._runner: Optional["web.AppRunner"] = None
+
+    @property
+    def url(self) -> str:
+        """The base URL of the server."""
+        return f"http://{self.host}:{self.port}"
+
+    async def _handle_forecast(self, request: "web.Request") -> "web.Response":
+        self.requests += 1
+        if request.transport not in self._transports:
+            self._transports.add(request.transport)
+            self.connections += 1
+        cities = request.query.getall("city", [])
+        self.cities_served += len(cities)
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response(await SyntheticForecastProvider().fetch(cities))
+
+    async def start(self) -> None:
+        """Start serving."""
+        app = web.Application()
+        app.router.add_get("/forecast", self._handle_forecast)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        # Resolve the port picked by the OS when port 0 was requested
+        self.port = site._server.sockets[0].getsockname()[1]  # type: ignore[union-attr]
+        logger.info(f"Fake forecast server listening on {self.url}")
+
+    async def stop(self) -> None:
+        """Stop serving."""
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class BatchLoader:
+    """
+    Batch lookups into bulk fetches, DataLoader-style.
+
+    Lookups made within `window` seconds of each other are fetched together
+    in a single call, and concurrent lookups of the same key share one result.
+    """
+
+    def __init__(
+        self,
+        fetch_many: Callable[[List[str]], Awaitable[Dict[str, Any]]],
+        window: float = 0.005,
+        max_batch: int = 64,
+    ):
+        """
+        Create a batch loader.
+
+        Args:
+            fetch_many: Coroutine function fetching a list of keys at once
+            window: How long to collect lookups before fetching, in seconds
+            max_batch: Maximum number of keys per fetch
+        """
+        self.fetch_many = fetch_many
+        self.window = window
+        self.max_batch = max_batch
+        self.batches = 0
+        self._futures: Dict[str, "asyncio.Future[Any]"] = {}
+        self._batch: List[str] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def load(self, key: str) -> Any:
+        """
+        Load the value of a key.
+
+        Returns:
+            The fetched value, or None if the key was not found upstream
+        """
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            self._batch.append(key)
+            if len(self._batch) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+        return await asyncio.shield(future)
+
+    def _dispatch(self) -> None:
+        """Start fetching the current batch."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        keys, self._batch = self._batch, []
+        if keys:
+            task = asyncio.get_running_loop().create_task(self._fetch(keys))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, keys: List[str]) -> None:
+        """Fetch a batch and resolve the futures waiting for it."""
+        self.batches += 1
+        try:
+            values = await self.fetch_many(keys)
+        except Exception as e:
+            logger.error(f"Batch fetch of {len(keys)} keys failed: {e}")
+            for key in keys:
+                future = self._futures.pop(key)
+                future.set_exception(e)
+                # Mark the exception as retrieved in case every waiter left
+                future.exception()
+            return
+
+        for key in keys:
+            self._futures.pop(key).set_result(values.get(key))
+
+
+class ForecastService:
+    """
+    Serve city weather from a stale-while-revalidate cache.
+
+    Fresh entries are returned as-is. Stale entries are returned immediately
+    while a background refresh runs, and expired or missing entries are
+    fetched through a BatchLoader. Callers needing fresher data, such as
+    alerts, pass a max_age to get(), which bypasses stale-while-revalidate.
+    """
+
+    def __init__(
+        self,
+        provider: ForecastProvider,
+        fresh_seconds: float = 60.0,
+        stale_seconds: float = 600.0,
+        batch_window: float = 0.005,
+        max_batch: int = 64,
+    ):
+        """
+        Create a forecast service.
+
+        Args:
+            provider: The upstream forecast provider
+            fresh_seconds: How long an entry is served without revalidation
+            stale_seconds: How long a stale entry may be served while revalidating
+            batch_window: Window in which lookups are batched, in seconds
+            max_batch: Maximum number of cities per upstream fetch
+        """
+        self.provider = provider
+        self.fresh_seconds = fresh_seconds
+        self.stale_seconds = stale_seconds
+        self.loader = BatchLoader(provider.fetch, batch_window, max_batch)
+        self._cache: Dict[str, Tuple[CityWeather, float]] = {}
+        self._revalidating: Dict[str, "asyncio.Task[Optional[CityWeather]]"] = {}
+
+    @classmethod
+    def from_env(cls) -> "ForecastService":
+        """Use the HTTP service at MCP_FORECAST_URL if set, synthetic data otherwise."""
+        url = os.environ.get(FORECAST_URL_ENV)
+        if url:
+            logger.info(f"Fetching forecasts from {url}")
+            return cls(HttpForecastProvider(url))
+        return cls(SyntheticForecastProvider())
+
+    async def get(
+        self, city: str, max_age: Optional[float] = None
+    ) -> Optional[CityWeather]:
+        """
+        Get the weather of a city.
+
+        Args:
+            city: The name of the city
+            max_age: Maximum age of the returned weather in seconds. Older
+                entries are refetched before returning, never served stale
+                (None: the service's fresh and stale periods apply)
+
+        Returns:
+            The city weather, or None if the provider doesn't know the city
+        """
+        entry = self._cache.get(city)
+        if entry is not None:
+            weather, fetched_at = entry
+            age = time.monotonic() - fetched_at
+            if max_age is not None:
+                if age < max_age:
+                    return weather
+            elif age < self.fresh_seconds:
+                return weather
+            elif age < self.stale_seconds:
+                self._revalidate(city)
+                return weather
+        return await self._refresh(city)
+
+    async def _refresh(self, city: str) -> Optional[CityWeather]:
+        """Fetch a city through the batch loader and cache the result."""
+        weather = await self.loader.load(city)
+        if weather is not None:
+            self._cache[city] = (weather, time.monotonic())
+        return weather
+
+    def _revalidate(self, city: str) -> None:
+        """Refresh a stale entry in the background, once at a time per city."""
+        if city in self._revalidating:
+            return
+        task = asyncio.get_running_loop().create_task(self._refresh(city))
+        self._revalidating[city] = task
+
+        def done(task: "asyncio.Task[Optional[CityWeather]]") -> None:
+            self._revalidating.pop(city, None)
+            if not task.cancelled() and task.exception() is not None:
+                logger.warning(f"Revalidating {city} failed: {task.exception()}")
+
+        task.add_done_callback(done)
+
+    async def close(self) -> None:
+        """Cancel background refreshes and close the provider."""
+        for task in list(self._revalidating.values()):
+            task.cancel()
+        await self.provider.close()
+
+
+async def benchmark(lookups: int, latency: float) -> None:
+    """
+    Compare per-lookup fetches and batched lookups against the fake server.
+
+    The baselines fetch every lookup on its own, the way a tool would call
+    the upstream without this module: first opening a new connection each
+    time, then through a pooled session. The last run batches the lookups
+    through a BatchLoader on a pooled session, as ForecastService does.
+
+    Args:
+        lookups: Number of concurrent city lookups per run
+        latency: Artificial latency of the fake server, in seconds
+    """
+    cities = list(CITIES)
+    runs = [
+        ("per-lookup, new connections", False, False),
+        ("per-lookup, pooled session", True, False),
+        ("batched, pooled session", True, True),
+    ]
+    for label, pooled, batched in runs:
+        server = FakeForecastServer(latency=latency)
+        await server.start()
+        provider = HttpForecastProvider(server.url, pooled=pooled)
+
+        loader = BatchLoader(provider.fetch) if batched else None
+
+        async def lookup(city: str) -> Optional[CityWeather]:
+            if loader is not None:
+                return await loader.load(city)
+            return (await provider.fetch([city])).get(city)
+
+        try:
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(lookup(random.choice(cities)) for _ in range(lookups))
+            )
+            elapsed = time.perf_counter() - start
+        finally:
+            await provider.close()
+            await server.stop()
+
+        logger.info(
+            f"{label}: {lookups} lookups in {elapsed * 1000:.1f} ms, "
+            f"{server.requests} upstream requests over {server.connections} connections"
+        )
+
+
+async def serve(port: int, latency: float) -> None:
+    """Run the fake forecast server until interrupted."""
+    server = FakeForecastServer(port=port, latency=latency)
+    await server.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    parser = argparse.ArgumentParser(description="Forecast provider tools.")
+    parser.add_argument(
+        "--serve", action="store_true", help="Run the fake forecast server"
+    )
+    parser.add_argument("--port", type=int, default=8765, help="Port for --serve")
+    parser.add_argument(
+        "--lookups", type=int, default=500, help="Concurrent lookups per benchmark run"
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0.02,
+        help="Artificial latency of the fake server in seconds",
+    )
+    args = parser.parse_args()
+
+    try:
+        if args.serve:
+            asyncio.run(serve(args.port, args.latency))
+        else:
+            asyncio.run(benchmark(args.lookups, args.latency))
+    except KeyboardInterrupt:
+        pass
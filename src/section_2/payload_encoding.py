@@ -0,0 +1,172 @@
+"""
+MCP Tutorial - Section 2: Large Payload Encoding
+This module demonstrates how a tool can return large text without sending it
+as one huge content item. The payload is split into chunks, optionally
+compressed with an encoding the client accepts, and preceded by a small
+JSON header describing how to reassemble it:
+
+    [{"payload": "chunked", "encoding": "zlib", "chunks": 3, "length": 4194304},
+     "<chunk 1>", "<chunk 2>", "<chunk 3>"]
+
+Each item becomes one text content item of the tool response. Compressed
+payloads are base64-encoded, since content items carry text. Small payloads
+that are neither chunked nor compressed are returned as plain text.
+
+zlib is always available; zstd is used when the optional zstandard package
+is installed.
+"""
+
+import base64
+import json
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+try:
+    import zstandard
+except ImportError:  # zstd is only offered when zstandard is installed
+    zstandard = None
+
+# Marker identifying the header item of a chunked payload
+PAYLOAD_MARKER = "chunked"
+
+# Payloads shorter than this are never compressed, in characters
+COMPRESSION_MIN_SIZE = 64 * 1024
+
+
+def _compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    """The available encodings, in order of preference."""
+    compressors: Dict[str, Callable[[bytes], bytes]] = {}
+    if zstandard is not None:
+        compressors["zstd"] = zstandard.ZstdCompressor().compress
+    compressors["zlib"] = zlib.compress
+    return compressors
+
+
+def _decompress(encoding: str, data: bytes) -> bytes:
+    """Decompress data compressed with one of the supported encodings."""
+    if encoding == "zlib":
+        return zlib.decompress(data)
+    if encoding == "zstd":
+        if zstandard is None:
+            raise ValueError("zstd payloads require the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unsupported payload encoding: {encoding}")
+
+
+def available_encodings() -> List[str]:
+    """Return the compression encodings this process supports."""
+    return list(_compressors())
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the encoding to use from a client's accepted encodings.
+
+    Args:
+        accept_encoding: Comma-separated encodings in the client's order of
+            preference, such as "zstd, zlib"
+
+    Returns:
+        The first accepted encoding supported here, or None for no compression
+    """
+    compressors = _compressors()
+    for encoding in accept_encoding.split(","):
+        encoding = encoding.strip().lower()
+        if encoding in compressors:
+            return encoding
+    return None
+
+
+def encode_payload(
+    text: str, chunk_size: int = 0, accept_encoding: str = ""
+) -> Union[str, List[str]]:
+    """
+    Encode a text payload for a tool response.
+
+    Args:
+        text: The text to return
+        chunk_size: Maximum number of characters per chunk (0: no chunking)
+        accept_encoding: Compression encodings accepted by the client
+
+    Returns:
+        The text itself when it is neither chunked nor compressed, otherwise
+        a header item followed by the chunks
+    """
+    encoding = None
+    data = text
+    if accept_encoding and len(text) >= COMPRESSION_MIN_SIZE:
+        encoding = choose_encoding(accept_encoding)
+        if encoding is not None:
+            raw = text.encode("utf-8")
+            compressed = _compressors()[encoding](raw)
+            # Only keep the compressed form if it is smaller after base64
+            if (len(compressed) + 2) // 3 * 4 < len(raw):
+                data = base64.b64encode(compressed).decode("ascii")
+            else:
+                encoding = None
+
+    # Text that looks like a header is wrapped too, so it can't be misread
+    if (
+        encoding is None
+        and (chunk_size <= 0 or len(text) <= chunk_size)
+        and parse_header(text) is None
+    ):
+        return text
+
+    step = chunk_size if chunk_size > 0 else len(data) or 1
+    chunks = [data[i : i + step] for i in range(0, len(data), step)]
+    header = {
+        "payload": PAYLOAD_MARKER,
+        "encoding": encoding or "identity",
+        "chunks": len(chunks),
+        "length": len(text),
+    }
+    return [json.dumps(header), *chunks]
+
+
+def parse_header(text: str) -> Optional[Dict[str, Any]]:
+    """Return the header of a chunked payload, or None if text isn't one."""
+    if not text.startswith('{"payload"'):
+        return None
+    try:
+        header = json.loads(text)
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(header, dict) or header.get("payload") != PAYLOAD_MARKER:
+        return None
+    return header
+
+
+def decode_payload(items: Sequence[str]) -> str:
+    """
+    Reassemble a text payload from the text content items of a tool response.
+
+    Args:
+        items: The texts of the content items
+
+    Returns:
+        The original text
+
+    Raises:
+        ValueError: If the chunks are incomplete or the encoding is unsupported
+    """
+    if not items:
+        return ""
+    header = parse_header(items[0])
+    if header is None:
+        return "".join(items)
+
+    chunks = items[1:]
+    if len(chunks) != header["chunks"]:
+        raise ValueError(
+            f"Expected {header['chunks']} payload chunks, got {len(chunks)}"
+        )
+    data = "".join(chunks)
+    if header["encoding"] != "identity":
+        raw = _decompress(header["encoding"], base64.b64decode(data))
+        data = raw.decode("utf-8")
+    if len(data) != header["length"]:
+        raise ValueError(
+            f"Expected a payload of {header['length']} characters, got {len(data)}"
+        )
+    return data
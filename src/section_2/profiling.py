@@ -0,0 +1,235 @@
+"""
+MCP Tutorial - Section 2: Per-Tool Profiling
+This module demonstrates an opt-in profiling mode for MCP servers. When the
+MCP_PROFILE_DIR environment variable is set, every tool invocation records
+its wall and CPU time, its memory use (tracemalloc) and a cProfile of its
+body, written to that directory as:
+
+- <tool>-<pid>-<n>.prof: a pstats dump (snakeviz, flameprof, pstats)
+- <tool>-<pid>-<n>.folded: collapsed stacks (flamegraph.pl, speedscope, inferno)
+- profile_summary.jsonl: one line per invocation with the tool, its
+  arguments and the measured resources
+
+cProfile, tracemalloc and the CPU clock measure the whole process, not one
+coroutine: while a profiled tool awaits, whatever else the event loop runs
+(the transport, the MCP session, tools that aren't profiled) is charged to
+it. The numbers are exact for tools that don't await and an upper bound for
+those that do.
+"""
+
+import asyncio
+import cProfile
+import functools
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from typing import Any, Dict, Optional, Tuple
+
+from common import ToolFn
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that enables profiling and names the output directory
+PROFILE_DIR_ENV = "MCP_PROFILE_DIR"
+
+# Arguments longer than this are truncated in the summary
+MAX_ARGUMENTS_REPR = 200
+
+FuncKey = Tuple[str, int, str]
+
+
+def _frame_label(func: FuncKey) -> str:
+    """Format a pstats function key as a collapsed-stack frame."""
+    filename, lineno, name = func
+    if filename == "~":
+        # Built-in functions have no file
+        label = name
+    else:
+        label = f"{name} ({os.path.basename(filename)}:{lineno})"
+    return label.replace(";", ",")
+
+
+def folded_stacks(stats: pstats.Stats, max_depth: int = 64) -> Dict[str, int]:
+    """
+    Convert cProfile statistics to collapsed stacks.
+
+    cProfile only records caller/callee edges, not full stacks, so the time
+    of a function reached through several paths is split between them in
+    proportion to the cumulative time of each edge.
+
+    Args:
+        stats: The profile statistics
+        max_depth: Maximum depth of the generated stacks
+
+    Returns:
+        A mapping of ';'-separated stacks to their self time in microseconds
+    """
+    raw: Dict[FuncKey, Any] = stats.stats  # type: ignore[attr-defined]
+    callees: Dict[FuncKey, Dict[FuncKey, Any]] = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, {})[func] = edge
+
+    stacks: Dict[str, int] = {}
+
+    def visit(func: FuncKey, path: Tuple[str, ...], fraction: float) -> None:
+        _, _, tt, ct, _ = raw[func]
+        path = path + (_frame_label(func),)
+        weight = int(tt * fraction * 1_000_000)
+        if weight > 0:
+            key = ";".join(path)
+            stacks[key] = stacks.get(key, 0) + weight
+
+        if len(path) >= max_depth:
+            return
+        for callee, edge in callees.get(func, {}).items():
+            if _frame_label(callee) in path:
+                # Skip recursion, its time is already counted by the callers
+                continue
+            callee_ct = raw[callee][3]
+            if callee_ct > 0:
+                visit(callee, path, fraction * edge[3] / callee_ct)
+
+    for func, (_, _, _, _, callers) in raw.items():
+        if not callers:
+            visit(func, (), 1.0)
+    return stacks
+
+
+class ToolProfiler:
+    """
+    Record per-invocation resource usage of tool functions.
+
+    Profiled invocations run one at a time, since a cProfile.Profile can't be
+    enabled twice. This keeps profiled tools from being charged for each
+    other, but not for the rest of the event loop, see the module docstring.
+    Apply profile above `@admission.limit`, so that invocations wait for the
+    profiler before taking admission slots, not while holding them.
+    """
+
+    def __init__(self, directory: Optional[str]):
+        """
+        Create a tool profiler.
+
+        Args:
+            directory: Output directory for the profiles (None: profiling disabled)
+        """
+        self.directory = directory
+        self._lock = asyncio.Lock()
+        self._counter = 0
+
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            logger.info(f"Profiling tool invocations into {directory}")
+
+    @classmethod
+    def from_env(cls) -> "ToolProfiler":
+        """Create a profiler that is enabled when MCP_PROFILE_DIR is set."""
+        return cls(os.environ.get(PROFILE_DIR_ENV) or None)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether profiling is enabled."""
+        return self.directory is not None
+
+    def profile(self, fn: ToolFn) -> ToolFn:
+        """
+        Decorate a tool function so that its invocations are profiled.
+
+        When profiling is disabled the function is returned unchanged.
+
+        Args:
+            fn: The tool function to profile
+
+        Returns:
+            The profiled tool function
+        """
+        directory = self.directory
+        if directory is None:
+            return fn
+
+        tool_name = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            async with self._lock:
+                self._counter += 1
+                basename = os.path.join(
+                    directory, f"{tool_name}-{os.getpid()}-{self._counter}"
+                )
+
+                profiler = cProfile.Profile()
+                tracemalloc.reset_peak()
+                start_memory, _ = tracemalloc.get_traced_memory()
+                wall_start = time.perf_counter()
+                cpu_start = time.process_time()
+
+                profiler.enable()
+                try:
+                    return await fn(*args, **kwargs)
+                finally:
+                    profiler.disable()
+                    wall_time = time.perf_counter() - wall_start
+                    cpu_time = time.process_time() - cpu_start
+                    end_memory, peak_memory = tracemalloc.get_traced_memory()
+                    self._write(
+                        tool_name,
+                        directory,
+                        basename,
+                        kwargs,
+                        profiler,
+                        wall_time,
+                        cpu_time,
+                        end_memory - start_memory,
+                        peak_memory - start_memory,
+                    )
+
+        return wrapper  # type: ignore[return-value]
+
+    def _write(
+        self,
+        tool_name: str,
+        directory: str,
+        basename: str,
+        arguments: Dict[str, Any],
+        profiler: cProfile.Profile,
+        wall_time: float,
+        cpu_time: float,
+        retained_bytes: int,
+        peak_bytes: int,
+    ) -> None:
+        """Write the profile files and the summary line of one invocation."""
+        try:
+            profiler.dump_stats(f"{basename}.prof")
+            stats = pstats.Stats(profiler)
+            with open(f"{basename}.folded", "w") as f:
+                for stack, weight in folded_stacks(stats).items():
+                    f.write(f"{stack} {weight}\n")
+
+            arguments_repr = repr(arguments)
+            if len(arguments_repr) > MAX_ARGUMENTS_REPR:
+                arguments_repr = arguments_repr[:MAX_ARGUMENTS_REPR] + "..."
+
+            summary = {
+                "tool": tool_name,
+                "arguments": arguments_repr,
+                "timestamp": time.time(),
+                "wall_ms": round(wall_time * 1000, 3),
+                "cpu_ms": round(cpu_time * 1000, 3),
+                # Traced memory still held after the call (negative if it
+                # freed more than it kept), and its high-water mark above
+                # the memory traced when it started
+                "retained_bytes": retained_bytes,
+                "peak_bytes": peak_bytes,
+                "profile": f"{basename}.prof",
+                "folded": f"{basename}.folded",
+            }
+            with open(os.path.join(directory, "profile_summary.jsonl"), "a") as f:
+                f.write(json.dumps(summary) + "\n")
+        except OSError as e:
+            logger.error(f"Failed to write profile for {tool_name}: {e}")
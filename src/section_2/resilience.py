@@ -0,0 +1,311 @@
+"""
+MCP Tutorial - Section 2: Adaptive Timeouts and Hedged Requests
+This module demonstrates how a client can cut tail latency without
+overloading the server: per-tool timeouts derived from observed latencies,
+hedged duplicate requests to a second session, and a bounded retry budget.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from typing import Any, Deque, Dict, List, Mapping, Optional, Sequence, Set
+
+from admission import payload_size
+from common import call_tool_with_meta, percentile
+from mcp.types import CallToolResult
+
+logger = logging.getLogger(__name__)
+
+# Field set in the _meta of hedged requests, so that traffic logs can tell
+# them from the calls they duplicate
+HEDGE_META_KEY = "hedge"
+
+
+class LatencyTracker:
+    """Keep a sliding window of observed latencies for each tool."""
+
+    def __init__(self, window: int = 200):
+        """
+        Create a latency tracker.
+
+        Args:
+            window: Number of most recent samples kept per tool
+        """
+        self._samples: Dict[str, Deque[float]] = defaultdict(
+            lambda: deque(maxlen=window)
+        )
+
+    def record(self, tool_name: str, seconds: float) -> None:
+        """Record the latency of a successful call."""
+        self._samples[tool_name].append(seconds)
+
+    def count(self, tool_name: str) -> int:
+        """Return the number of samples recorded for a tool."""
+        return len(self._samples[tool_name])
+
+    def percentile(self, tool_name: str, q: float) -> Optional[float]:
+        """
+        Return the q-th percentile (0-1) of the latencies of a tool.
+
+        Returns:
+            The latency in seconds, or None if nothing has been recorded yet
+        """
+        samples = self._samples[tool_name]
+        if not samples:
+            return None
+        return percentile(samples, q)
+
+
+class RetryBudget:
+    """
+    Limit retries and hedges to a fraction of the regular traffic.
+
+    Every request deposits `ratio` tokens and every retry or hedge spends one,
+    so extra load on the server stays bounded even when all calls are slow.
+    """
+
+    def __init__(
+        self, ratio: float = 0.1, initial_tokens: float = 3.0, max_tokens: float = 10.0
+    ):
+        """
+        Create a retry budget.
+
+        Args:
+            ratio: Tokens earned per regular request
+            initial_tokens: Tokens available before any request was made
+            max_tokens: Upper bound on the number of saved tokens
+        """
+        self.ratio = ratio
+        self.max_tokens = max_tokens
+        self._tokens = min(initial_tokens, max_tokens)
+
+    def record_request(self) -> None:
+        """Earn tokens for a regular request."""
+        self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        """Spend a token for a retry or hedge, if one is available."""
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+
+@dataclass(frozen=True)
+class ToolPolicy:
+    """
+    How AdaptiveSession treats the calls of a single tool.
+
+    Args:
+        idempotent: Whether the tool may safely run twice for one call;
+            only idempotent tools are retried or hedged
+        adaptive_timeout: Whether the timeout is learned from past latencies;
+            pass-through tools whose latency depends on the payload should
+            use max_timeout instead
+        seconds_per_mb: Extra timeout granted per MB of arguments
+    """
+
+    idempotent: bool = False
+    adaptive_timeout: bool = True
+    seconds_per_mb: float = 0.0
+
+
+class AdaptiveSession:
+    """
+    Call tools on a pool of sessions with adaptive timeouts and hedging.
+
+    Each call gets a timeout derived from the observed latency of its tool.
+    Once a call has been outstanding longer than the tool's hedge percentile,
+    a duplicate request is sent to another session of the pool and the first
+    response wins. Timed-out calls are retried while the retry budget allows.
+    Retries and hedges run the tool again, so only tools whose ToolPolicy is
+    idempotent get them. Every other attribute is delegated to the first
+    session of the pool.
+    """
+
+    def __init__(
+        self,
+        sessions: Sequence[Any],
+        policies: Optional[Mapping[str, ToolPolicy]] = None,
+        tracker: Optional[LatencyTracker] = None,
+        budget: Optional[RetryBudget] = None,
+        min_timeout: float = 0.5,
+        max_timeout: float = 10.0,
+        timeout_multiplier: float = 3.0,
+        hedge_percentile: float = 0.95,
+        min_samples: int = 5,
+        max_attempts: int = 2,
+    ):
+        """
+        Create an adaptive session.
+
+        Args:
+            sessions: Initialized client sessions connected to equivalent servers
+            policies: Mapping of tool names to their policy; other tools get the
+                default ToolPolicy (not idempotent: no retries or hedges)
+            tracker: Latency tracker shared between calls
+            budget: Retry budget shared by retries and hedges
+            min_timeout: Lower bound on the per-call timeout in seconds
+            max_timeout: Timeout used until enough samples are collected, and
+                upper bound on the adaptive timeout
+            timeout_multiplier: Factor applied to the p99 latency to get the timeout
+            hedge_percentile: Latency percentile after which a hedge is sent
+            min_samples: Samples required before timeouts and hedges adapt
+            max_attempts: Maximum number of attempts per call, including the first
+        """
+        if not sessions:
+            raise ValueError("At least one session is required")
+        self.sessions = list(sessions)
+        self.policies = dict(policies or {})
+        self.tracker = tracker or LatencyTracker()
+        self.budget = budget or RetryBudget()
+        self.min_timeout = min_timeout
+        self.max_timeout = max_timeout
+        self.timeout_multiplier = timeout_multiplier
+        self.hedge_percentile = hedge_percentile
+        self.min_samples = min_samples
+        self.max_attempts = max_attempts
+        self.hedges_sent = 0
+        self.retries = 0
+        self._next_session = 0
+
+    def policy_for(self, tool_name: str) -> ToolPolicy:
+        """Return the policy of a tool."""
+        return self.policies.get(tool_name, ToolPolicy())
+
+    def timeout_for(
+        self, tool_name: str, arguments: Optional[Dict[str, Any]] = None
+    ) -> float:
+        """Return the timeout in seconds for the next call to a tool."""
+        policy = self.policy_for(tool_name)
+        timeout = self.max_timeout
+        p99 = self.tracker.percentile(tool_name, 0.99)
+        if (
+            policy.adaptive_timeout
+            and p99 is not None
+            and self.tracker.count(tool_name) >= self.min_samples
+        ):
+            timeout = max(
+                self.min_timeout, min(self.max_timeout, p99 * self.timeout_multiplier)
+            )
+        if policy.seconds_per_mb and arguments:
+            size_mb = payload_size(list(arguments.values())) / (1024 * 1024)
+            timeout += size_mb * policy.seconds_per_mb
+        return timeout
+
+    def hedge_delay_for(self, tool_name: str) -> Optional[float]:
+        """Return how long to wait before hedging a call, or None to never hedge."""
+        if (
+            len(self.sessions) < 2
+            or not self.policy_for(tool_name).idempotent
+            or self.tracker.count(tool_name) < self.min_samples
+        ):
+            return None
+        return self.tracker.percentile(tool_name, self.hedge_percentile)
+
+    async def call_tool(
+        self, name: str, arguments: Optional[Dict[str, Any]] = None
+    ) -> CallToolResult:
+        """
+        Call a tool with an adaptive timeout, hedging and bounded retries.
+
+        Args:
+            name: The name of the tool to call
+            arguments: The arguments to pass to the tool
+
+        Returns:
+            The first response received for the call
+
+        Raises:
+            asyncio.TimeoutError: If every allowed attempt timed out
+        """
+        self.budget.record_request()
+        max_attempts = self.max_attempts if self.policy_for(name).idempotent else 1
+        attempt = 1
+        while True:
+            timeout = self.timeout_for(name, arguments)
+            try:
+                return await self._call_hedged(name, arguments, timeout)
+            except asyncio.TimeoutError:
+                if attempt >= max_attempts or not self.budget.try_spend():
+                    logger.warning(f"Call to {name} timed out after {timeout:.2f}s")
+                    raise
+                attempt += 1
+                self.retries += 1
+                logger.info(f"Call to {name} timed out after {timeout:.2f}s, retrying")
+
+    async def _call_hedged(
+        self, name: str, arguments: Optional[Dict[str, Any]], timeout: float
+    ) -> CallToolResult:
+        """Run one attempt, sending a hedge if the primary is slow."""
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        deadline = start + timeout
+        primary = self._pick_session()
+        pending: Set["asyncio.Task[CallToolResult]"] = {
+            asyncio.create_task(primary.call_tool(name, arguments))
+        }
+        hedge_delay = self.hedge_delay_for(name)
+        errors: List[BaseException] = []
+
+        try:
+            while pending:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+
+                wait_for = remaining
+                can_hedge = hedge_delay is not None and len(pending) == 1 and not errors
+                if can_hedge:
+                    wait_for = min(
+                        remaining, max(0.0, start + hedge_delay - loop.time())
+                    )
+
+                done, pending = await asyncio.wait(
+                    pending, timeout=wait_for, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is None:
+                        self.tracker.record(name, loop.time() - start)
+                        return task.result()
+                    errors.append(task.exception())
+
+                if not done and can_hedge and self.budget.try_spend():
+                    # The primary is slower than usual: race it against another session
+                    self.hedges_sent += 1
+                    hedge_delay = None
+                    logger.debug(f"Hedging call to {name}")
+                    hedge = self._pick_session(exclude=primary)
+                    pending.add(
+                        asyncio.create_task(
+                            call_tool_with_meta(
+                                hedge, name, arguments, {HEDGE_META_KEY: True}
+                            )
+                        )
+                    )
+                elif not done and can_hedge:
+                    hedge_delay = None
+
+            raise errors[0]
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def _pick_session(self, exclude: Optional[Any] = None) -> Any:
+        """
+        Pick the next session of the pool in round-robin order.
+
+        Args:
+            exclude: A session not to pick, such as the primary of a hedge;
+                the pool must hold at least one other session
+        """
+        while True:
+            session = self.sessions[self._next_session % len(self.sessions)]
+            self._next_session += 1
+            if session is not exclude:
+                return session
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate everything else to the first session."""
+        return getattr(self.sessions[0], name)
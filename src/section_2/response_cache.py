@@ -0,0 +1,311 @@
+"""
+MCP Tutorial - Section 2: Client-Side Response Cache
+This module demonstrates a read-through cache around ClientSession.call_tool.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from mcp.types import CallToolResult
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """
+    Caching policy for a single tool.
+
+    Args:
+        ttl_seconds: How long a cached response stays valid (None: never expires)
+        cacheable: Decides whether a response may be cached (default: any
+            response that isn't an error, see is_error_response)
+    """
+
+    ttl_seconds: Optional[float] = 300.0
+    cacheable: Optional[Callable[[CallToolResult], bool]] = None
+
+
+def is_error_response(result: CallToolResult) -> bool:
+    """
+    Check whether a tool response reports an error.
+
+    Besides isError results, this detects tools that return their errors as
+    a regular JSON object with an "error" key, such as the weather tools.
+    """
+    if result.isError:
+        return True
+    for item in result.content:
+        text = getattr(item, "text", None)
+        if not text or not text.startswith("{"):
+            continue
+        try:
+            payload = json.loads(text)
+        except json.JSONDecodeError:
+            continue
+        if isinstance(payload, dict) and "error" in payload:
+            return True
+    return False
+
+
+class ToolResponseCache:
+    """
+    An LRU cache of tool responses with per-tool TTL policies.
+
+    Only tools that have a policy are cached, so the policies double as an
+    allow-list: tools with side effects or time-dependent results must not be
+    listed. Entries can optionally be persisted to a SQLite file so that a
+    later run starts warm; the file holds at most max_entries rows too, the
+    least recently used ones being deleted first.
+    """
+
+    def __init__(
+        self,
+        policies: Dict[str, CachePolicy],
+        max_entries: int = 256,
+        persist_path: Optional[str] = None,
+        namespace: str = "",
+    ):
+        """
+        Create a response cache.
+
+        Args:
+            policies: Mapping of cacheable tool names to their caching policy
+            max_entries: Maximum number of responses kept in memory, and in
+                the persistent file
+            persist_path: Optional path of a SQLite file used to persist entries
+            namespace: Identifies the server, so that clients of different
+                servers can share one persistent file without mixing entries
+        """
+        self.policies = dict(policies)
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Tuple[Optional[float], CallToolResult]]" = (
+            OrderedDict()
+        )
+        self._db: Optional[sqlite3.Connection] = None
+
+        if persist_path:
+            self._db = sqlite3.connect(persist_path)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, tool TEXT, expires_at REAL, payload TEXT, "
+                "last_used REAL NOT NULL DEFAULT 0)"
+            )
+            columns = [
+                row[1] for row in self._db.execute("PRAGMA table_info(responses)")
+            ]
+            if "last_used" not in columns:
+                # Files written before the bound: their rows are evicted first
+                self._db.execute(
+                    "ALTER TABLE responses ADD COLUMN last_used REAL NOT NULL DEFAULT 0"
+                )
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)"
+            )
+            # Drop anything that expired while the cache was not in use
+            self._db.execute(
+                "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?",
+                (time.time(),),
+            )
+            self._db.commit()
+
+    def is_cacheable(self, tool_name: str) -> bool:
+        """Check whether responses of a tool may be cached."""
+        return tool_name in self.policies
+
+    def make_key(self, tool_name: str, arguments: Optional[Dict[str, Any]]) -> str:
+        """Build a stable cache key from the server, tool name and arguments."""
+        return json.dumps(
+            [self.namespace, tool_name, arguments or {}],
+            sort_keys=True,
+            separators=(",", ":"),
+        )
+
+    def get(
+        self, tool_name: str, arguments: Optional[Dict[str, Any]]
+    ) -> Optional[CallToolResult]:
+        """
+        Look up a cached response.
+
+        Args:
+            tool_name: The name of the tool
+            arguments: The arguments the tool was called with
+
+        Returns:
+            The cached response, or None if there is no valid entry
+        """
+        key = self.make_key(tool_name, arguments)
+        now = time.time()
+
+        entry = self._entries.get(key)
+        if entry is None and self._db is not None:
+            row = self._db.execute(
+                "SELECT expires_at, payload FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                entry = (row[0], CallToolResult.model_validate_json(row[1]))
+                self._remember(key, entry)
+                self._db.execute(
+                    "UPDATE responses SET last_used = ? WHERE key = ?", (now, key)
+                )
+                self._db.commit()
+
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at is None or expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return result
+            self._forget(key)
+
+        self.misses += 1
+        return None
+
+    def put(
+        self,
+        tool_name: str,
+        arguments: Optional[Dict[str, Any]],
+        result: CallToolResult,
+    ) -> None:
+        """
+        Store a response for a cacheable tool.
+
+        Args:
+            tool_name: The name of the tool
+            arguments: The arguments the tool was called with
+            result: The response returned by the server
+        """
+        policy = self.policies.get(tool_name)
+        if policy is None:
+            return
+        cacheable = policy.cacheable or (lambda result: not is_error_response(result))
+        if not cacheable(result):
+            return
+
+        key = self.make_key(tool_name, arguments)
+        now = time.time()
+        expires_at = None if policy.ttl_seconds is None else now + policy.ttl_seconds
+        self._remember(key, (expires_at, result))
+
+        if self._db is not None:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, tool, expires_at, payload, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, tool_name, expires_at, result.model_dump_json(), now),
+            )
+            # Apply the LRU bound to the file as well, or it grows forever
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses "
+                "ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._db.commit()
+
+    def close(self) -> None:
+        """Close the persistent store, if any, keeping what was used most recently."""
+        if self._db is not None:
+            # Hits served from memory didn't touch the file: record them now
+            now = time.time()
+            self._db.executemany(
+                "UPDATE responses SET last_used = ? WHERE key = ?",
+                [(now, key) for key in self._entries],
+            )
+            self._db.commit()
+            self._db.close()
+            self._db = None
+
+    def _remember(
+        self, key: str, entry: Tuple[Optional[float], CallToolResult]
+    ) -> None:
+        """Insert an entry in memory, evicting the least recently used ones."""
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _forget(self, key: str) -> None:
+        """Remove an expired entry from memory and from disk."""
+        self._entries.pop(key, None)
+        if self._db is not None:
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            self._db.commit()
+
+
+class CachedClientSession:
+    """
+    Wrap a client session so that call_tool reads through a ToolResponseCache.
+
+    Identical calls that are already in flight share a single request. Every
+    other attribute is delegated to the wrapped session.
+    """
+
+    def __init__(self, session: Any, cache: ToolResponseCache):
+        """
+        Create a caching wrapper.
+
+        Args:
+            session: An initialized ClientSession (or anything with call_tool)
+            cache: The cache to read through
+        """
+        self._session = session
+        self.cache = cache
+        self._in_flight: Dict[str, "asyncio.Future[CallToolResult]"] = {}
+
+    async def call_tool(
+        self, name: str, arguments: Optional[Dict[str, Any]] = None
+    ) -> CallToolResult:
+        """
+        Call a tool, serving allow-listed tools from the cache when possible.
+
+        Args:
+            name: The name of the tool to call
+            arguments: The arguments to pass to the tool
+
+        Returns:
+            The (possibly cached) tool response
+        """
+        if not self.cache.is_cacheable(name):
+            return await self._session.call_tool(name, arguments)
+
+        cached = self.cache.get(name, arguments)
+        if cached is not None:
+            logger.debug(f"Cache hit for {name}")
+            return cached
+
+        key = self.cache.make_key(name, arguments)
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+
+        future: "asyncio.Future[CallToolResult]" = (
+            asyncio.get_running_loop().create_future()
+        )
+        self._in_flight[key] = future
+        try:
+            result = await self._session.call_tool(name, arguments)
+            self.cache.put(name, arguments, result)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Avoid "exception was never retrieved" warnings without waiters
+            future.exception()
+            raise
+        finally:
+            del self._in_flight[key]
+
+    def __getattr__(self, name: str) -> Any:
+        """Delegate everything else to the wrapped session."""
+        return getattr(self._session, name)
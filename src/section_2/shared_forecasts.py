@@ -0,0 +1,336 @@
+"""
+MCP Tutorial - Section 2: Shared Forecast Store
+This module demonstrates how several server processes on one host can share
+precomputed forecasts instead of each holding its own copy. Forecasts are
+stored as fixed-size records in a memory-mapped file, indexed by city id and
+date, so every worker maps the same pages.
+
+File layout (little-endian):
+
+    header:  magic (8s) | cities (I) | days (I) | generation (Q)
+    slot i:  sequence (Q) | generation (Q) | fetched_at (d) | first day (q)
+             followed by `days` records of temperature_c (d) |
+             precipitation_chance (B) | condition code (B)
+
+Readers never take a lock. Each slot is guarded by a sequence counter that
+writers make odd while they update it (a seqlock), and readers retry when it
+changed under them. Bumping the header generation invalidates every slot at
+once. Writers serialize through an advisory file lock where available.
+
+The file name carries a digest of the layout (cities, conditions and days),
+so processes running another layout, e.g. during a rolling deploy that
+changes the cities, use another file instead of resizing one that is mapped.
+
+A second lock file, <path>.lock, elects the process that fills the store:
+claim_writer() takes it without blocking and keeps it until close(), so one
+process fetches and writes the forecasts while the others only read them.
+"""
+
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+from contextlib import contextmanager
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+try:
+    import fcntl
+except ImportError:  # Windows: writers are not serialized across processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+# Environment variable naming the shared forecast file
+SHARED_FORECASTS_ENV = "MCP_SHARED_FORECASTS"
+
+MAGIC = b"MCPFCST1"
+HEADER = struct.Struct("<8sIIQ")
+SLOT_HEADER = struct.Struct("<QQdq")
+RECORD = struct.Struct("<dBB")
+
+# Condition code of records that hold no data
+NO_CONDITION = 255
+
+# Number of times a reader retries a slot that is being written
+MAX_READ_RETRIES = 100
+
+# Suffix of the lock file held by the process that fills the store
+WRITER_LOCK_SUFFIX = ".lock"
+
+
+def layout_path(
+    path: str, cities: Sequence[str], conditions: Sequence[str], days: int
+) -> str:
+    """Return the file holding the store of a layout, named after its digest."""
+    layout = json.dumps([list(cities), list(conditions), days]).encode("utf-8")
+    return f"{path}.{hashlib.sha256(layout).hexdigest()[:12]}"
+
+
+class SharedForecastStore:
+    """Fixed-size forecast records shared between processes through mmap."""
+
+    def __init__(
+        self, path: str, cities: Sequence[str], conditions: Sequence[str], days: int
+    ):
+        """
+        Open (or create) a shared forecast file.
+
+        Processes passing the same cities, conditions and days share a file:
+        cities are identified by their index and conditions stored as their
+        index, so other layouts get a file of their own (see layout_path).
+
+        Args:
+            path: The base path of the file backing the store
+            cities: The city names, in city id order
+            conditions: The weather conditions, in code order
+            days: Number of daily records per city
+
+        Raises:
+            ValueError: If the file exists but wasn't written by this layout
+        """
+        self.path = layout_path(path, cities, conditions, days)
+        self.city_ids = {city: i for i, city in enumerate(cities)}
+        self.conditions = list(conditions)
+        self.condition_codes = {c: i for i, c in enumerate(self.conditions)}
+        self.days = days
+        self.slot_size = SLOT_HEADER.size + days * RECORD.size
+        size = HEADER.size + len(cities) * self.slot_size
+
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            with self._write_lock():
+                header = os.pread(self._fd, HEADER.size, 0)
+                if not header:
+                    os.ftruncate(self._fd, size)
+                    os.pwrite(self._fd, HEADER.pack(MAGIC, len(cities), days, 1), 0)
+                elif (
+                    len(header) < HEADER.size
+                    or HEADER.unpack(header)[:3] != (MAGIC, len(cities), days)
+                    or os.fstat(self._fd).st_size != size
+                ):
+                    # Never resize it: other processes may have it mapped
+                    raise ValueError(
+                        f"{self.path} is not a forecast store of this layout, "
+                        f"remove it or use another {SHARED_FORECASTS_ENV}"
+                    )
+        except BaseException:
+            os.close(self._fd)
+            raise
+        self._map = mmap.mmap(self._fd, size)
+        self._writer_fd: Optional[int] = None
+        self.is_writer = False
+        logger.info(f"Sharing forecasts through {self.path}")
+
+    @classmethod
+    def from_env(
+        cls, cities: Sequence[str], conditions: Sequence[str], days: int
+    ) -> Optional["SharedForecastStore"]:
+        """Open the store named by MCP_SHARED_FORECASTS, or return None if unset."""
+        path = os.environ.get(SHARED_FORECASTS_ENV)
+        return cls(path, cities, conditions, days) if path else None
+
+    def claim_writer(self) -> bool:
+        """
+        Try to become the process that fills the store, without blocking.
+
+        The claim is kept until close(), and released by the OS if the
+        process dies, so another process can take over.
+
+        Returns:
+            True if this process holds the claim
+        """
+        if self.is_writer:
+            return True
+        if fcntl is None:
+            # No cross-process locks: every process fills the store
+            self.is_writer = True
+            return True
+        if self._writer_fd is None:
+            self._writer_fd = os.open(
+                self.path + WRITER_LOCK_SUFFIX, os.O_RDWR | os.O_CREAT, 0o644
+            )
+        try:
+            fcntl.flock(self._writer_fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            return False
+        self.is_writer = True
+        return True
+
+    @property
+    def generation(self) -> int:
+        """The current generation; slots written in older ones are invalid."""
+        return HEADER.unpack_from(self._map, 0)[3]
+
+    def invalidate(self) -> None:
+        """Invalidate every slot at once by bumping the generation."""
+        with self._write_lock():
+            magic, cities, days, generation = HEADER.unpack_from(self._map, 0)
+            HEADER.pack_into(self._map, 0, magic, cities, days, generation + 1)
+
+    def write(self, city: str, days: List[Dict[str, Any]]) -> bool:
+        """
+        Store the daily forecasts of a city.
+
+        Args:
+            city: The name of the city
+            days: Consecutive daily forecasts with "date", "temperature_c",
+                "precipitation_chance" and "condition"
+
+        Returns:
+            True if the forecasts were stored, False if they don't fit the
+            layout: unknown city or condition, missing fields, dates that
+            aren't consecutive, or values the records can't hold
+        """
+        city_id = self.city_ids.get(city)
+        if city_id is None or not days:
+            return False
+        try:
+            records = self._pack_days(days)
+        except (struct.error, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Not storing the forecasts of {city}: {e}")
+            return False
+        if records is None:
+            return False
+        first_day = date.fromisoformat(days[0]["date"]).toordinal()
+
+        offset = HEADER.size + city_id * self.slot_size
+        with self._write_lock():
+            sequence = SLOT_HEADER.unpack_from(self._map, offset)[0]
+            # An odd sequence tells readers the slot is being written
+            SLOT_HEADER.pack_into(
+                self._map,
+                offset,
+                sequence + 1,
+                self.generation,
+                time.time(),
+                first_day,
+            )
+            self._map[offset + SLOT_HEADER.size : offset + self.slot_size] = records
+            struct.pack_into("<Q", self._map, offset, sequence + 2)
+        return True
+
+    def fetched_at(self, city: str) -> Optional[float]:
+        """Return when the forecasts of a city were written, or None if invalid."""
+        city_id = self.city_ids.get(city)
+        if city_id is None:
+            return None
+        sequence, generation, fetched_at, _ = SLOT_HEADER.unpack_from(
+            self._map, HEADER.size + city_id * self.slot_size
+        )
+        if sequence == 0 or generation != self.generation:
+            return None
+        return fetched_at
+
+    def _pack_days(self, days: List[Dict[str, Any]]) -> Optional[bytearray]:
+        """
+        Pack daily forecasts into the records of a slot.
+
+        Returns:
+            The records, or None if the dates aren't consecutive or a
+            condition is unknown
+
+        Raises:
+            struct.error, ValueError, KeyError, TypeError: If a field is
+                missing or its value can't be stored
+        """
+        first_day = date.fromisoformat(days[0]["date"]).toordinal()
+        records = bytearray(self.days * RECORD.size)
+        for i in range(self.days):
+            if i < len(days):
+                day = days[i]
+                if date.fromisoformat(day["date"]).toordinal() != first_day + i:
+                    return None
+                code = self.condition_codes.get(day["condition"])
+                if code is None:
+                    return None
+                RECORD.pack_into(
+                    records,
+                    i * RECORD.size,
+                    day["temperature_c"],
+                    day["precipitation_chance"],
+                    code,
+                )
+            else:
+                RECORD.pack_into(records, i * RECORD.size, 0.0, 0, NO_CONDITION)
+        return records
+
+    def read(
+        self, city: str, max_age: Optional[float] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Read the daily forecasts of a city, starting today.
+
+        Args:
+            city: The name of the city
+            max_age: Maximum age of the forecasts in seconds (None: any age)
+
+        Returns:
+            The daily forecasts, or None if the slot is empty, invalid, too old
+            or doesn't cover today
+        """
+        city_id = self.city_ids.get(city)
+        if city_id is None:
+            return None
+        offset = HEADER.size + city_id * self.slot_size
+        today = date.today().toordinal()
+
+        for _ in range(MAX_READ_RETRIES):
+            sequence, generation, fetched_at, first_day = SLOT_HEADER.unpack_from(
+                self._map, offset
+            )
+            if sequence % 2:
+                continue
+            if sequence == 0 or generation != self.generation:
+                return None
+            if max_age is not None and time.time() - fetched_at > max_age:
+                return None
+
+            start = today - first_day
+            if start < 0 or start >= self.days:
+                return None
+            days = []
+            for i in range(start, self.days):
+                temperature_c, precipitation_chance, code = RECORD.unpack_from(
+                    self._map, offset + SLOT_HEADER.size + i * RECORD.size
+                )
+                if code == NO_CONDITION:
+                    break
+                days.append(
+                    {
+                        "date": date.fromordinal(first_day + i).isoformat(),
+                        "temperature_c": temperature_c,
+                        "precipitation_chance": precipitation_chance,
+                        "condition": self.conditions[code],
+                    }
+                )
+
+            # Only trust the copy if no writer touched the slot meanwhile
+            if SLOT_HEADER.unpack_from(self._map, offset)[0] == sequence:
+                return days
+        return None
+
+    def close(self) -> None:
+        """Unmap and close the file, releasing the writer claim; the data stays."""
+        self._map.close()
+        os.close(self._fd)
+        if self._writer_fd is not None:
+            # Closing the descriptor releases its flock
+            os.close(self._writer_fd)
+            self._writer_fd = None
+            self.is_writer = False
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        """Serialize writers across processes."""
+        if fcntl is None:
+            yield
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
@@ -6,12 +6,17 @@ This script demonstrates how to create a client that connects to an MCP server.
 import asyncio
 import json
 import logging
+import os
 import sys
 from contextlib import AsyncExitStack
-from datetime import timedelta
 
-from mcp import ClientSession
-from mcp.client.stdio import StdioServerParameters, stdio_client
+from common import connect_session_pool, server_environment
+from mcp.client.stdio import StdioServerParameters
+from payload_encoding import available_encodings, decode_payload
+from resilience import AdaptiveSession, ToolPolicy
+from response_cache import CachedClientSession, CachePolicy, ToolResponseCache
+from tracing import Tracer
+from traffic_capture import TrafficRecorder
 
 # Configure logging
 logging.basicConfig(
@@ -20,6 +25,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Tools that always return plain text, possibly chunked or compressed
+PLAIN_TEXT_TOOLS = {"echo"}
+
 
 async def test_server():
     """Test connecting to the MCP server and calling its tools."""
@@ -34,40 +42,67 @@ async def test_server():
         server_params = StdioServerParameters(
             command=sys.executable,  # Use sys.executable for better portability
             args=[server_script_path],
-            env=None,
+            env=server_environment(),
         )
 
         logger.info(f"Connecting to server at {server_script_path}...")
 
-        # Connect to the server using stdio_client
-        stdio_transport = await exit_stack.enter_async_context(
-            stdio_client(server_params)
-        )
-        read_stream, write_stream = stdio_transport
+        # Set MCP_TRAFFIC_LOG to record every JSON-RPC message
+        recorder = TrafficRecorder.from_env("client")
+        if recorder is not None:
+            exit_stack.callback(recorder.close)
+
+        # Set MCP_TRACE_FILE to trace the latency breakdown of every tool call
+        tracer = Tracer.from_env("simple_client")
+        exit_stack.callback(tracer.close)
 
-        # Create the client session with a reasonable timeout
-        client = await exit_stack.enter_async_context(
-            ClientSession(
-                read_stream, write_stream, read_timeout_seconds=timedelta(seconds=10)
-            )
+        # Connect a small pool of sessions so slow calls can be hedged
+        sessions = await connect_session_pool(
+            exit_stack, server_params, tracer, recorder
         )
 
-        # IMPORTANT: Initialize the session before making any tool calls
-        logger.info("Initializing the client session...")
-        await client.initialize()
+        # Only the pure tools are retried and hedged. echo passes payloads of
+        # any size through, so its timeout grows with the payload instead of
+        # being learned from small calls.
+        client = AdaptiveSession(
+            sessions,
+            policies={
+                "echo": ToolPolicy(adaptive_timeout=False, seconds_per_mb=1.0),
+                "add_numbers": ToolPolicy(idempotent=True),
+                "sort_list": ToolPolicy(idempotent=True),
+            },
+        )
 
         # List available tools
         response = await client.list_tools()
         tools = response.tools
         logger.info(f"Connected to server with tools: {[tool.name for tool in tools]}")
 
+        # Cache responses of the pure tools so repeated calls skip the server.
+        # Set MCP_CLIENT_CACHE_PATH to persist the cache to a SQLite file.
+        cache = ToolResponseCache(
+            {
+                "add_numbers": CachePolicy(ttl_seconds=None),
+                "sort_list": CachePolicy(ttl_seconds=None),
+            },
+            max_entries=128,
+            persist_path=os.environ.get("MCP_CLIENT_CACHE_PATH"),
+            namespace=server_script_path,
+        )
+        exit_stack.callback(cache.close)
+        client = CachedClientSession(client, cache)
+
         # Helper function to safely extract content from responses
-        def extract_content(response):
+        def extract_content(response, tool=None):
             """Extract content from a tool response, handling different formats."""
             if not response.content:
                 logger.debug("No content in response")
                 return None
 
+            # Plain-text tools skip JSON sniffing, large texts are only joined
+            if tool in PLAIN_TEXT_TOOLS:
+                return decode_payload([item.text for item in response.content])
+
             # If there's only one content item, process it normally
             if len(response.content) == 1:
                 content = response.content[0].text
@@ -95,12 +130,38 @@ async def test_server():
         logger.info(f"Calling echo with: '{echo_text}'")
 
         echo_response = await client.call_tool("echo", {"text": echo_text})
-        echo_result = extract_content(echo_response)
+        echo_result = extract_content(echo_response, "echo")
 
         logger.info(f"Echo result: {echo_result}")
         assert echo_result == echo_text, "Echo result didn't match input"
         logger.info("✅ Echo tool test passed!")
 
+        # Echo a large document in chunks, compressed if the server agrees
+        logger.info("\n=== Testing large echo ===")
+        large_text = "MCP moves large documents in chunks. " * 100_000
+        accept_encoding = ", ".join(available_encodings())
+        logger.info(
+            f"Calling echo with {len(large_text)} characters "
+            f"(accepting: {accept_encoding})"
+        )
+
+        large_echo_response = await client.call_tool(
+            "echo",
+            {
+                "text": large_text,
+                "chunk_size": 1024 * 1024,
+                "accept_encoding": accept_encoding,
+            },
+        )
+        large_echo_result = extract_content(large_echo_response, "echo")
+        received = sum(len(item.text) for item in large_echo_response.content)
+        logger.info(
+            f"Received {len(large_echo_response.content)} content items "
+            f"totalling {received} characters"
+        )
+        assert large_echo_result == large_text, "Large echo result didn't match input"
+        logger.info("✅ Large echo test passed!")
+
         # 2. Test the add_numbers tool
         logger.info("\n=== Testing add_numbers tool ===")
         a, b = 42.5, 7.5
@@ -115,6 +176,15 @@ async def test_server():
         ), "Addition result didn't match expected output"
         logger.info("✅ Add numbers tool test passed!")
 
+        # Repeating the call is served from the client-side cache
+        hits_before = cache.hits
+        cached_add_response = await client.call_tool("add_numbers", {"a": a, "b": b})
+        assert (
+            extract_content(cached_add_response) == add_result
+        ), "Cached result didn't match the original result"
+        assert cache.hits == hits_before + 1, "Repeated call wasn't served from cache"
+        logger.info("✅ Add numbers cache test passed!")
+
         # 3. Test the sort_list tool
         logger.info("\n=== Testing sort_list tool ===")
         items = ["banana", "apple", "cherry", "date"]
@@ -176,11 +246,9 @@ async def test_server():
 async def main():
     """Main function to run the client tests."""
     try:
-        # Set a timeout for the entire test
-        await asyncio.wait_for(test_server(), timeout=60.0)
+        # Every call is bounded by its own timeout, see AdaptiveSession
+        await test_server()
         logger.info("Client test completed successfully!")
-    except asyncio.TimeoutError:
-        logger.error("Client test timed out after 60 seconds")
     except Exception as e:
         logger.exception(f"Error during client test: {e}")
         raise
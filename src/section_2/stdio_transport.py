@@ -0,0 +1,351 @@
+"""
+MCP Tutorial - Section 2: Observable stdio Transports
+The stdio transports of the MCP Python SDK decode and encode messages in
+background tasks, out of reach of the code using them. This module provides
+equivalents of mcp.client.stdio.stdio_client and mcp.server.stdio.stdio_server
+that report to a TransportObserver when each message is read, decoded,
+encoded and written, so that tracing can tell JSON encoding from pipe I/O.
+The server transport can also reject request lines longer than a limit
+while reading them, before they are buffered whole or parsed.
+
+They mirror the transports of the SDK versions in SUPPORTED_MCP_VERSIONS,
+whose streams carry JSONRPCMessage objects. Under any other SDK version the
+stock transports are used instead and a warning is logged: observers then
+receive nothing, but connections work.
+"""
+
+import json
+import logging
+import re
+import sys
+import time
+from contextlib import asynccontextmanager
+from importlib.metadata import PackageNotFoundError, version
+from io import TextIOWrapper
+from typing import Any, AsyncIterator, Optional
+
+import anyio
+import anyio.lowlevel
+from anyio.streams.text import TextReceiveStream
+from mcp import types
+from mcp.client.stdio import (
+    StdioServerParameters,
+    get_default_environment,
+    stdio_client,
+)
+from mcp.server.fastmcp import FastMCP
+from mcp.server.stdio import stdio_server
+
+logger = logging.getLogger(__name__)
+
+# SDK versions (major, minor) whose stdio transports this module mirrors
+SUPPORTED_MCP_VERSIONS = [(1, 3)]
+
+# Size of the reads from stdin when request lines are limited
+READ_CHUNK_SIZE = 64 * 1024
+
+# Bytes kept from each end of an oversized line to find its request id, which
+# serializers put either first or last
+ID_SCAN_BYTES = 256
+_ID_VALUE = rb'"id"\s*:\s*(-?\d+|"(?:[^"\\]|\\.)*")'
+LEADING_ID_PATTERN = re.compile(
+    rb'^\s*\{\s*(?:"jsonrpc"\s*:\s*"2\.0"\s*,\s*)?' + _ID_VALUE
+)
+TRAILING_ID_PATTERN = re.compile(rb",\s*" + _ID_VALUE + rb"\s*\}\s*$")
+
+
+def now_us() -> float:
+    """Wall-clock time in microseconds, comparable between local processes."""
+    return time.time_ns() / 1000
+
+
+def mcp_version_supported() -> bool:
+    """Check whether the installed MCP SDK is one this module mirrors."""
+    try:
+        major, minor = (int(part) for part in version("mcp").split(".")[:2])
+    except (PackageNotFoundError, ValueError):
+        return False
+    return (major, minor) in SUPPORTED_MCP_VERSIONS
+
+
+class TransportObserver:
+    """Receive the timing of the messages crossing a stdio transport."""
+
+    def received(self, message: Any, read_at: float, decoded_at: float) -> None:
+        """A message line was read at read_at and decoded at decoded_at."""
+
+    def encoded(self, message: Any, encoded_at: float) -> None:
+        """A message is about to be written, encoded at encoded_at."""
+
+    def written(self, message: Any, written_at: float) -> None:
+        """A message was written to the pipe at written_at."""
+
+
+def _use_stock_transport(customized: bool) -> bool:
+    """Whether to fall back to the SDK transport."""
+    if not customized:
+        return True
+    if not mcp_version_supported():
+        logger.warning(
+            f"mcp {version('mcp')} is not one of the supported versions "
+            f"{SUPPORTED_MCP_VERSIONS}, transport timing and request line "
+            f"limits are disabled"
+        )
+        return True
+    return False
+
+
+def oversized_request_error(
+    head: bytes, tail: bytes, size: int, max_line_bytes: int
+) -> Optional[types.JSONRPCMessage]:
+    """
+    Build the error answering a request line that exceeds the size limit.
+
+    Only the top-level id is matched: the one opening the object, or the one
+    closing it.
+
+    Args:
+        head: The first bytes of the line
+        tail: The last bytes of the line
+        size: The size of the line in bytes
+        max_line_bytes: The limit it exceeds
+
+    Returns:
+        The JSON-RPC error, or None if no request id was found (notifications
+        get no answer)
+    """
+    match = LEADING_ID_PATTERN.search(head) or TRAILING_ID_PATTERN.search(tail)
+    if match is None:
+        return None
+    try:
+        request_id = json.loads(match.group(1))
+    except ValueError:
+        return None
+    return types.JSONRPCMessage(
+        types.JSONRPCError(
+            jsonrpc="2.0",
+            id=request_id,
+            error=types.ErrorData(
+                code=types.INVALID_REQUEST,
+                message=(
+                    f"Request of {size} bytes exceeds the limit of "
+                    f"{max_line_bytes} bytes"
+                ),
+            ),
+        )
+    )
+
+
+@asynccontextmanager
+async def stdio_client_transport(
+    server: StdioServerParameters, observer: Optional[TransportObserver] = None
+) -> AsyncIterator[Any]:
+    """
+    Connect to a server over stdio, reporting message timing to an observer.
+
+    Without an observer this is mcp.client.stdio.stdio_client.
+
+    Args:
+        server: The server to start
+        observer: The observer to report to
+    """
+    if _use_stock_transport(observer is not None):
+        async with stdio_client(server) as streams:
+            yield streams
+        return
+    assert observer is not None
+
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    process = await anyio.open_process(
+        [server.command, *server.args],
+        env=server.env if server.env is not None else get_default_environment(),
+        stderr=sys.stderr,
+    )
+
+    async def stdout_reader() -> None:
+        assert process.stdout, "Opened process is missing stdout"
+        try:
+            async with read_stream_writer:
+                buffer = ""
+                async for chunk in TextReceiveStream(
+                    process.stdout,
+                    encoding=server.encoding,
+                    errors=server.encoding_error_handler,
+                ):
+                    lines = (buffer + chunk).split("\n")
+                    buffer = lines.pop()
+                    for line in lines:
+                        read_at = now_us()
+                        try:
+                            message = types.JSONRPCMessage.model_validate_json(line)
+                        except Exception as exc:
+                            await read_stream_writer.send(exc)
+                            continue
+                        observer.received(message, read_at, now_us())
+                        await read_stream_writer.send(message)
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async def stdin_writer() -> None:
+        assert process.stdin, "Opened process is missing stdin"
+        try:
+            async with write_stream_reader:
+                async for message in write_stream_reader:
+                    encoded = message.model_dump_json(by_alias=True, exclude_none=True)
+                    data = (encoded + "\n").encode(
+                        encoding=server.encoding,
+                        errors=server.encoding_error_handler,
+                    )
+                    observer.encoded(message, now_us())
+                    await process.stdin.send(data)
+                    observer.written(message, now_us())
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg, process:
+        tg.start_soon(stdout_reader)
+        tg.start_soon(stdin_writer)
+        yield read_stream, write_stream
+
+
+@asynccontextmanager
+async def stdio_server_transport(
+    observer: Optional[TransportObserver] = None,
+    max_line_bytes: Optional[int] = None,
+) -> AsyncIterator[Any]:
+    """
+    Serve over stdio, reporting message timing to an observer.
+
+    Without an observer or line limit this is mcp.server.stdio.stdio_server.
+
+    Args:
+        observer: The observer to report to
+        max_line_bytes: Maximum size of a request line in bytes. Longer lines
+            are discarded while they are read, and answered with an
+            INVALID_REQUEST error (None: no limit)
+    """
+    if _use_stock_transport(observer is not None or max_line_bytes is not None):
+        async with stdio_server() as streams:
+            yield streams
+        return
+    observer = observer or TransportObserver()
+
+    stdin = anyio.wrap_file(sys.stdin.buffer)
+    stdout = anyio.wrap_file(TextIOWrapper(sys.stdout.buffer, encoding="utf-8"))
+    read_stream_writer, read_stream = anyio.create_memory_object_stream(0)
+    write_stream, write_stream_reader = anyio.create_memory_object_stream(0)
+
+    async def handle_line(line: bytes) -> None:
+        if not line.strip():
+            return
+        read_at = now_us()
+        try:
+            message = types.JSONRPCMessage.model_validate_json(line)
+        except Exception as exc:
+            await read_stream_writer.send(exc)
+            return
+        observer.received(message, read_at, now_us())
+        await read_stream_writer.send(message)
+
+    async def reject_line(head: bytes, tail: bytes, size: int) -> None:
+        assert max_line_bytes is not None
+        logger.warning(
+            f"Rejected a request of {size} bytes (limit: {max_line_bytes} bytes)"
+        )
+        error = oversized_request_error(head, tail, size, max_line_bytes)
+        if error is not None:
+            await write_stream.send(error)
+
+    async def stdin_reader() -> None:
+        buffer = bytearray()
+        # Size of the oversized line being skipped, and its first and last bytes
+        skipped: Optional[int] = None
+        head = tail = b""
+        try:
+            async with read_stream_writer:
+                while True:
+                    chunk = await stdin.read1(READ_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    start = 0
+                    while True:
+                        newline = chunk.find(b"\n", start)
+                        end = len(chunk) if newline < 0 else newline
+                        if skipped is not None:
+                            skipped += end - start
+                            tail = (tail + chunk[start:end])[-ID_SCAN_BYTES:]
+                        else:
+                            buffer += chunk[start:end]
+                            if max_line_bytes is not None and (
+                                len(buffer) > max_line_bytes
+                            ):
+                                # Stop buffering: skip the rest of the line
+                                head = bytes(buffer[:ID_SCAN_BYTES])
+                                tail = bytes(buffer[-ID_SCAN_BYTES:])
+                                skipped = len(buffer)
+                                buffer.clear()
+                        if newline < 0:
+                            break
+
+                        if skipped is not None:
+                            await reject_line(head, tail, skipped)
+                            skipped = None
+                        else:
+                            await handle_line(bytes(buffer))
+                            buffer.clear()
+                        start = newline + 1
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async def stdout_writer() -> None:
+        try:
+            async with write_stream_reader:
+                async for message in write_stream_reader:
+                    encoded = message.model_dump_json(by_alias=True, exclude_none=True)
+                    observer.encoded(message, now_us())
+                    await stdout.write(encoded + "\n")
+                    await stdout.flush()
+                    observer.written(message, now_us())
+        except anyio.ClosedResourceError:
+            await anyio.lowlevel.checkpoint()
+
+    async with anyio.create_task_group() as tg:
+        tg.start_soon(stdin_reader)
+        tg.start_soon(stdout_writer)
+        yield read_stream, write_stream
+
+
+async def run_stdio(
+    server: FastMCP,
+    recorder: Optional[Any] = None,
+    observer: Optional[TransportObserver] = None,
+    max_request_bytes: Optional[int] = None,
+) -> None:
+    """
+    Run a FastMCP server over stdio.
+
+    Args:
+        server: The server to run
+        recorder: A TrafficRecorder recording every message, if any
+        observer: The observer of the transport timing, if any
+        max_request_bytes: Maximum size of a request line (None: no limit)
+    """
+    if recorder is None and observer is None and max_request_bytes is None:
+        await server.run_stdio_async()
+        return
+
+    # Same as FastMCP.run_stdio_async, which has no way to take other
+    # streams, with the transport observed and the streams wrapped
+    async with stdio_server_transport(observer, max_request_bytes) as (
+        read_stream,
+        write_stream,
+    ):
+        if recorder is not None:
+            read_stream, write_stream = recorder.wrap(read_stream, write_stream)
+        await server._mcp_server.run(
+            read_stream,
+            write_stream,
+            server._mcp_server.create_initialization_options(),
+        )
@@ -0,0 +1,456 @@
+"""
+MCP Tutorial - Section 2: Latency Breakdown Tracing
+This module demonstrates how to trace a tool call end to end, across the
+client and server processes, to see where its latency goes. When the
+MCP_TRACE_FILE environment variable is set, every traced tools/call records
+these spans:
+
+- client serialize: from call_tool until the request is encoded to JSON
+- transport write: writing the request to the server's stdin
+- server decode: parsing the request line on the server
+- validate: dispatching the request and validating the tool arguments
+- execute: running the tool, including admission control and profiling
+- encode: converting the result to content, encoding it and writing it out
+- client decode: from reading the response line until call_tool returns
+
+The gaps between transport write and server decode, and between encode and
+client decode, are the time spent in the pipes and waiting to be scheduled.
+
+The transport spans come from the observable stdio transports of
+stdio_transport.py. The trace context travels in the request's _meta as a W3C
+traceparent, so the spans of both processes share a trace id. Spans are appended to the
+trace file in the Chrome trace event format, which chrome://tracing,
+Perfetto (ui.perfetto.dev) and speedscope open directly. Run this module to
+summarize a trace file:
+
+    MCP_TRACE_FILE=trace.json python src/section_2/weather_client.py
+    python src/section_2/tracing.py trace.json
+"""
+
+import argparse
+import functools
+import itertools
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from common import ToolFn, percentile
+from mcp import types
+from mcp.client.stdio import StdioServerParameters
+from mcp.server.lowlevel.server import request_ctx
+from stdio_transport import TransportObserver, now_us, stdio_client_transport
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that enables tracing and names the trace file
+TRACE_FILE_ENV = "MCP_TRACE_FILE"
+
+# Order of the spans of a tool call, used by the summary
+SPAN_ORDER = [
+    "client serialize",
+    "transport write",
+    "server decode",
+    "validate",
+    "execute",
+    "encode",
+    "client decode",
+]
+
+
+def parse_traceparent(value: Any) -> Optional[Tuple[str, str]]:
+    """Return the (trace id, span id) of a W3C traceparent, or None."""
+    if not isinstance(value, str):
+        return None
+    parts = value.split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def message_traceparent(message: Any) -> Optional[str]:
+    """Return the traceparent carried in the _meta of a JSON-RPC request."""
+    root = getattr(message, "root", None)
+    if not isinstance(root, types.JSONRPCRequest) or not root.params:
+        return None
+    meta = root.params.get("_meta")
+    if not isinstance(meta, dict):
+        return None
+    return meta.get("traceparent")
+
+
+def response_id(message: Any) -> Any:
+    """Return the id of a JSON-RPC response or error, or None."""
+    root = getattr(message, "root", None)
+    if isinstance(root, (types.JSONRPCResponse, types.JSONRPCError)):
+        return root.id
+    return None
+
+
+class Tracer:
+    """
+    Record the latency breakdown of tool calls into a Chrome trace file.
+
+    A client and the servers it starts append to the same file; each line is
+    written with a single append-mode write.
+    """
+
+    def __init__(self, path: Optional[str], process_name: str):
+        """
+        Create a tracer.
+
+        Args:
+            path: The trace file to append to (None: tracing disabled)
+            process_name: The name shown for this process in trace viewers
+        """
+        self.path = path
+        self.process_name = process_name
+        self._fd: Optional[int] = None
+        self._lock = threading.Lock()
+        self._lanes = itertools.count(1)
+        # Client side: stamps of the calls in flight, by span id
+        self._calls: Dict[str, Dict[str, Any]] = {}
+        # Server side: stamps of the requests in flight, by JSON-RPC id
+        self._requests: Dict[Any, Dict[str, Any]] = {}
+
+        if path is not None:
+            self._fd = self._open(path)
+            self._write_event(
+                {
+                    "name": "process_name",
+                    "ph": "M",
+                    "pid": os.getpid(),
+                    "args": {"name": f"{process_name} ({os.getpid()})"},
+                }
+            )
+            logger.info(f"Tracing tool calls into {path}")
+
+    @classmethod
+    def from_env(cls, process_name: str) -> "Tracer":
+        """Create a tracer that is enabled when MCP_TRACE_FILE is set."""
+        return cls(os.environ.get(TRACE_FILE_ENV) or None, process_name)
+
+    @property
+    def enabled(self) -> bool:
+        """Whether tracing is enabled."""
+        return self._fd is not None
+
+    @staticmethod
+    def _open(path: str) -> int:
+        """Open the trace file for appending, starting the JSON array if new."""
+        if not os.path.exists(path):
+            # Create the file atomically with its opening bracket, so that
+            # processes starting together never append before it
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                f.write("[\n")
+            try:
+                os.link(temp_path, path)
+            except FileExistsError:
+                pass
+            finally:
+                os.unlink(temp_path)
+        return os.open(path, os.O_WRONLY | os.O_APPEND)
+
+    def _write_event(self, event: Dict[str, Any]) -> None:
+        """Append one trace event to the file."""
+        line = json.dumps(event, separators=(",", ":")) + ",\n"
+        with self._lock:
+            if self._fd is not None:
+                os.write(self._fd, line.encode("utf-8"))
+
+    def _span(
+        self,
+        name: str,
+        start: Optional[float],
+        end: Optional[float],
+        lane: int,
+        args: Dict[str, Any],
+    ) -> None:
+        """Append a complete span, if both of its ends were recorded."""
+        if start is None or end is None:
+            return
+        self._write_event(
+            {
+                "name": name,
+                "cat": "mcp",
+                "ph": "X",
+                "ts": start,
+                "dur": max(0.0, end - start),
+                "pid": os.getpid(),
+                "tid": lane,
+                "args": args,
+            }
+        )
+
+    def close(self) -> None:
+        """Close the trace file."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    # Client side
+
+    def wrap_session(self, session: Any) -> Any:
+        """Trace the tool calls of a client session (unchanged when disabled)."""
+        return TracedSession(session, self) if self.enabled else session
+
+    def stdio_client(self, server: StdioServerParameters) -> Any:
+        """
+        Connect to a server over stdio, timing the transport of traced calls.
+
+        When tracing is disabled the regular transport is used.
+        """
+        observer = ClientTraceObserver(self) if self.enabled else None
+        return stdio_client_transport(server, observer)
+
+    async def call_tool(
+        self,
+        session: Any,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> types.CallToolResult:
+        """
+        Call a tool with a new trace context and record its client spans.
+
+        Args:
+            session: The client session to call the tool on
+            name: The name of the tool
+            arguments: The tool arguments
+            meta: Other fields to send in the request's _meta
+
+        Returns:
+            The tool result
+        """
+        trace_id = os.urandom(16).hex()
+        span_id = os.urandom(8).hex()
+        traceparent = f"00-{trace_id}-{span_id}-01"
+        state: Dict[str, Any] = {"start": now_us()}
+        self._calls[span_id] = state
+
+        request = types.ClientRequest(
+            types.CallToolRequest(
+                method="tools/call",
+                params=types.CallToolRequestParams(
+                    name=name,
+                    arguments=arguments,
+                    _meta=types.RequestParams.Meta(
+                        **(meta or {}), traceparent=traceparent
+                    ),
+                ),
+            )
+        )
+        outcome = "error"
+        try:
+            result = await session.send_request(request, types.CallToolResult)
+            outcome = "tool error" if result.isError else "ok"
+            return result
+        finally:
+            end = now_us()
+            del self._calls[span_id]
+            lane = next(self._lanes)
+            args = {"trace_id": trace_id, "parent_id": span_id, "tool": name}
+            self._span(
+                f"tools/call {name}",
+                state["start"],
+                end,
+                lane,
+                {
+                    "trace_id": trace_id,
+                    "span_id": span_id,
+                    "tool": name,
+                    "request_id": state.get("request_id"),
+                    "outcome": outcome,
+                },
+            )
+            self._span(
+                "client serialize", state["start"], state.get("serialized"), lane, args
+            )
+            self._span(
+                "transport write",
+                state.get("serialized"),
+                state.get("written"),
+                lane,
+                args,
+            )
+            self._span("client decode", state.get("received"), end, lane, args)
+
+    # Server side
+
+    def server_observer(self) -> Optional["ServerTraceObserver"]:
+        """Return the observer timing the server transport, or None if disabled."""
+        return ServerTraceObserver(self) if self.enabled else None
+
+    def trace(self, fn: ToolFn) -> ToolFn:
+        """
+        Decorate a tool function so that its execution is timed.
+
+        When tracing is disabled the function is returned unchanged.
+
+        Args:
+            fn: The tool function to trace
+
+        Returns:
+            The traced tool function
+        """
+        if not self.enabled:
+            return fn
+
+        tool_name = fn.__name__
+
+        @functools.wraps(fn)
+        async def wrapper(*args: Any, **kwargs: Any) -> Any:
+            state = self._requests.get(request_ctx.get().request_id)
+            if state is None:
+                return await fn(*args, **kwargs)
+            state["tool"] = tool_name
+            state["started"] = now_us()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                state["finished"] = now_us()
+
+        return wrapper  # type: ignore[return-value]
+
+    def _finish_request(self, request_id: Any, state: Dict[str, Any], written: float):
+        """Record the server spans of a request once its response is written."""
+        lane = request_id if isinstance(request_id, int) else next(self._lanes)
+        args = {
+            "trace_id": state["trace_id"],
+            "parent_id": state["parent_id"],
+            "tool": state.get("tool"),
+            "request_id": request_id,
+        }
+        self._span("server decode", state["read"], state["decoded"], lane, args)
+        if "started" not in state:
+            # Rejected before the tool ran, e.g. by argument validation
+            self._span("validate", state["decoded"], written, lane, args)
+            return
+        self._span("validate", state["decoded"], state["started"], lane, args)
+        self._span("execute", state["started"], state.get("finished"), lane, args)
+        self._span("encode", state.get("finished"), written, lane, args)
+
+
+class ClientTraceObserver(TransportObserver):
+    """Record the transport stamps of the traced calls of one client connection."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+        # The calls waiting for a response on this connection, by JSON-RPC id
+        self._pending: Dict[Any, Dict[str, Any]] = {}
+
+    def encoded(self, message: Any, encoded_at: float) -> None:
+        context = parse_traceparent(message_traceparent(message))
+        state = self.tracer._calls.get(context[1]) if context else None
+        if state is not None:
+            state["serialized"] = encoded_at
+            state["request_id"] = message.root.id
+            self._pending[message.root.id] = state
+
+    def written(self, message: Any, written_at: float) -> None:
+        if isinstance(message.root, types.JSONRPCRequest):
+            state = self._pending.get(message.root.id)
+            if state is not None:
+                state["written"] = written_at
+
+    def received(self, message: Any, read_at: float, decoded_at: float) -> None:
+        state = self._pending.pop(response_id(message), None)
+        if state is not None:
+            state["received"] = read_at
+
+
+class ServerTraceObserver(TransportObserver):
+    """Record the transport stamps of traced requests on a server."""
+
+    def __init__(self, tracer: Tracer):
+        self.tracer = tracer
+
+    def received(self, message: Any, read_at: float, decoded_at: float) -> None:
+        context = parse_traceparent(message_traceparent(message))
+        if context is not None:
+            self.tracer._requests[message.root.id] = {
+                "trace_id": context[0],
+                "parent_id": context[1],
+                "read": read_at,
+                "decoded": decoded_at,
+            }
+
+    def written(self, message: Any, written_at: float) -> None:
+        request_id = response_id(message)
+        state = self.tracer._requests.pop(request_id, None)
+        if state is not None:
+            self.tracer._finish_request(request_id, state, written_at)
+
+
+class TracedSession:
+    """A client session wrapper that traces every tool call."""
+
+    def __init__(self, session: Any, tracer: Tracer):
+        """
+        Create a traced session.
+
+        Args:
+            session: The client session to wrap
+            tracer: The tracer recording the calls
+        """
+        self.session = session
+        self.tracer = tracer
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        meta: Optional[Dict[str, Any]] = None,
+    ) -> types.CallToolResult:
+        return await self.tracer.call_tool(self.session, name, arguments, meta)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+
+def load_trace(path: str) -> List[Dict[str, Any]]:
+    """Read the events of a trace file, whether or not its array is closed."""
+    with open(path, encoding="utf-8") as f:
+        text = f.read().strip()
+    if not text.endswith("]"):
+        text = text.rstrip(",") + "]"
+    return json.loads(text)
+
+
+def summarize(events: List[Dict[str, Any]]) -> None:
+    """Log the mean and p95 duration of every span, per tool."""
+    durations: Dict[Tuple[str, str], List[float]] = {}
+    tools: Dict[str, str] = {}
+    for event in events:
+        if event.get("ph") != "X":
+            continue
+        args = event.get("args", {})
+        if args.get("tool"):
+            tools[args["trace_id"]] = args["tool"]
+    for event in events:
+        if event.get("ph") != "X" or event["name"] not in SPAN_ORDER:
+            continue
+        tool = tools.get(event["args"].get("trace_id"), "?")
+        durations.setdefault((tool, event["name"]), []).append(event["dur"] / 1000)
+
+    for tool in sorted(set(tools.values())):
+        logger.info(f"\n=== {tool} ===")
+        for name in SPAN_ORDER:
+            values = durations.get((tool, name), [])
+            if not values:
+                continue
+            mean = sum(values) / len(values)
+            p95 = percentile(values, 0.95)
+            logger.info(
+                f"  {name:<17} n={len(values):<4} "
+                f"mean={mean:8.3f} ms  p95={p95:8.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    parser = argparse.ArgumentParser(description="Summarize an MCP trace file.")
+    parser.add_argument("trace", help="Trace file written with MCP_TRACE_FILE")
+    summarize(load_trace(parser.parse_args().trace))
@@ -0,0 +1,167 @@
+"""
+MCP Tutorial - Section 2: Traffic Capture
+This module demonstrates how to record the JSON-RPC traffic of an MCP client
+or server. When the MCP_TRAFFIC_LOG environment variable is set, every
+message sent or received is appended to that file as one compact JSON line:
+
+    {"ts":1740944199.68,"side":"client","conn":"4242-1","dir":"out","msg":{...}}
+
+- ts: wall-clock time in seconds
+- side: "client" or "server"
+- conn: identifies the connection, as request ids restart on each one
+- dir: "out" for sent messages and "in" for received messages
+- msg: the JSON-RPC message
+
+The log can be replayed against a local server with traffic_replay.py.
+"""
+
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Environment variable that enables capture and names the log file
+TRAFFIC_LOG_ENV = "MCP_TRAFFIC_LOG"
+
+
+def message_to_json(message: Any) -> Any:
+    """Convert a JSON-RPC message (or a transport exception) to plain JSON."""
+    if isinstance(message, Exception):
+        return {"exception": f"{type(message).__name__}: {message}"}
+    if hasattr(message, "model_dump"):
+        return message.model_dump(by_alias=True, mode="json", exclude_none=True)
+    return message
+
+
+class TrafficRecorder:
+    """
+    Append the JSON-RPC messages of one process to a traffic log.
+
+    Lines are written with a single append-mode write each, so several
+    processes (a client and the servers it starts) can share one log.
+    """
+
+    def __init__(self, path: str, side: str):
+        """
+        Create a traffic recorder.
+
+        Args:
+            path: The log file to append to
+            side: "client" or "server"
+        """
+        self.path = path
+        self.side = side
+        self._fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self._connections = itertools.count(1)
+        self._lock = threading.Lock()
+        logger.info(f"Recording {side} traffic to {path}")
+
+    @classmethod
+    def from_env(cls, side: str) -> Optional["TrafficRecorder"]:
+        """Create a recorder if MCP_TRAFFIC_LOG is set, otherwise return None."""
+        path = os.environ.get(TRAFFIC_LOG_ENV)
+        return cls(path, side) if path else None
+
+    def record(self, conn: str, direction: str, message: Any) -> None:
+        """
+        Append one message to the log.
+
+        Args:
+            conn: The connection id
+            direction: "out" for sent messages, "in" for received messages
+            message: The JSON-RPC message
+        """
+        line = json.dumps(
+            {
+                "ts": time.time(),
+                "side": self.side,
+                "conn": conn,
+                "dir": direction,
+                "msg": message_to_json(message),
+            },
+            separators=(",", ":"),
+            ensure_ascii=False,
+        )
+        with self._lock:
+            os.write(self._fd, (line + "\n").encode("utf-8"))
+
+    def wrap(self, read_stream: Any, write_stream: Any) -> Tuple[Any, Any]:
+        """
+        Wrap the streams of one connection so that their traffic is recorded.
+
+        Args:
+            read_stream: The stream messages are received from
+            write_stream: The stream messages are sent to
+
+        Returns:
+            The wrapped (read_stream, write_stream) pair
+        """
+        conn = f"{os.getpid()}-{next(self._connections)}"
+        return (
+            RecordingReceiveStream(read_stream, self, conn),
+            RecordingSendStream(write_stream, self, conn),
+        )
+
+    def close(self) -> None:
+        """Close the log file."""
+        os.close(self._fd)
+
+
+class RecordingReceiveStream:
+    """A receive stream wrapper that records every received message."""
+
+    def __init__(self, stream: Any, recorder: TrafficRecorder, conn: str):
+        self._stream = stream
+        self._recorder = recorder
+        self._conn = conn
+
+    async def receive(self) -> Any:
+        message = await self._stream.receive()
+        self._recorder.record(self._conn, "in", message)
+        return message
+
+    def __aiter__(self) -> "RecordingReceiveStream":
+        return self
+
+    async def __anext__(self) -> Any:
+        message = await self._stream.__anext__()
+        self._recorder.record(self._conn, "in", message)
+        return message
+
+    async def __aenter__(self) -> "RecordingReceiveStream":
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> Any:
+        return await self._stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
+
+
+class RecordingSendStream:
+    """A send stream wrapper that records every sent message."""
+
+    def __init__(self, stream: Any, recorder: TrafficRecorder, conn: str):
+        self._stream = stream
+        self._recorder = recorder
+        self._conn = conn
+
+    async def send(self, message: Any) -> None:
+        self._recorder.record(self._conn, "out", message)
+        await self._stream.send(message)
+
+    async def __aenter__(self) -> "RecordingSendStream":
+        await self._stream.__aenter__()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> Any:
+        return await self._stream.__aexit__(*exc_info)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._stream, name)
@@ -0,0 +1,257 @@
+"""
+MCP Tutorial - Section 2: Traffic Replay
+This script replays the tool calls of a traffic log captured with
+MCP_TRAFFIC_LOG (see traffic_capture.py) against a local server, then
+compares the replayed latencies and results with the recorded ones.
+
+Usage:
+    python src/section_2/traffic_replay.py traffic.log src/section_2/weather_server.py
+    python src/section_2/traffic_replay.py traffic.log src/section_2/weather_server.py --speed 10
+    python src/section_2/traffic_replay.py traffic.log src/section_2/weather_server.py --speed max
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from contextlib import AsyncExitStack
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Dict, List, Optional
+
+from common import percentile
+from mcp import ClientSession
+from mcp.client.stdio import (
+    StdioServerParameters,
+    get_default_environment,
+    stdio_client,
+)
+from resilience import HEDGE_META_KEY
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+)
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RecordedCall:
+    """A tools/call request found in a traffic log, with its response."""
+
+    offset: float
+    tool: str
+    arguments: Dict[str, Any]
+    latency: Optional[float] = None
+    result: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class ReplayedCall:
+    """The outcome of replaying a recorded call."""
+
+    recorded: RecordedCall
+    latency: float
+    result: Optional[Dict[str, Any]]
+    error: Optional[str] = None
+
+
+def load_calls(path: str) -> List[RecordedCall]:
+    """
+    Read the tool calls of a traffic log.
+
+    The client side of the log is used when present, since its timestamps
+    include the transport. Logs recorded on a server only are read from the
+    server side instead. Hedged requests, tagged by AdaptiveSession, are
+    skipped: they duplicate a recorded call, which is replayed once.
+
+    Args:
+        path: The traffic log to read
+
+    Returns:
+        The recorded calls, ordered by time, with offsets relative to the first
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f if line.strip()]
+
+    side = "client" if any(e["side"] == "client" for e in entries) else "server"
+    request_dir = "out" if side == "client" else "in"
+
+    calls: Dict[Any, RecordedCall] = {}
+    sent_at: Dict[Any, float] = {}
+    hedges = 0
+    for entry in entries:
+        if entry["side"] != side:
+            continue
+        message = entry["msg"]
+        key = (entry["conn"], message.get("id"))
+
+        if entry["dir"] == request_dir and message.get("method") == "tools/call":
+            params = message.get("params", {})
+            if (params.get("_meta") or {}).get(HEDGE_META_KEY):
+                hedges += 1
+                continue
+            calls[key] = RecordedCall(
+                offset=entry["ts"],
+                tool=params["name"],
+                arguments=params.get("arguments") or {},
+            )
+            sent_at[key] = entry["ts"]
+        elif entry["dir"] != request_dir and key in calls and "method" not in message:
+            calls[key].latency = entry["ts"] - sent_at[key]
+            calls[key].result = message.get("result")
+
+    if hedges:
+        logger.info(f"Skipped {hedges} hedged requests")
+
+    ordered = sorted(calls.values(), key=lambda call: call.offset)
+    if ordered:
+        start = ordered[0].offset
+        for call in ordered:
+            call.offset -= start
+    return ordered
+
+
+async def replay_calls(
+    calls: List[RecordedCall],
+    server_script_path: str,
+    speed: Optional[float],
+    concurrency: int,
+) -> List[ReplayedCall]:
+    """
+    Replay recorded calls against a freshly started server.
+
+    Args:
+        calls: The calls to replay
+        server_script_path: The server script to start
+        speed: Replay speed multiplier (None: as fast as possible)
+        concurrency: Maximum number of calls in flight
+
+    Returns:
+        The replayed calls, in the order of the recording
+    """
+    # Don't forward MCP_TRAFFIC_LOG, the replay must not append to the log it reads
+    server_params = StdioServerParameters(
+        command=sys.executable,
+        args=[server_script_path],
+        env=get_default_environment(),
+    )
+
+    async with AsyncExitStack() as exit_stack:
+        read_stream, write_stream = await exit_stack.enter_async_context(
+            stdio_client(server_params)
+        )
+        client = await exit_stack.enter_async_context(
+            ClientSession(
+                read_stream, write_stream, read_timeout_seconds=timedelta(seconds=30)
+            )
+        )
+        await client.initialize()
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def replay(call: RecordedCall) -> ReplayedCall:
+            if speed is not None:
+                await asyncio.sleep(max(0.0, start + call.offset / speed - loop.time()))
+            async with semaphore:
+                call_start = time.perf_counter()
+                try:
+                    response = await client.call_tool(call.tool, call.arguments)
+                    result = response.model_dump(
+                        by_alias=True, mode="json", exclude_none=True
+                    )
+                    error = None
+                except Exception as e:
+                    result = None
+                    error = f"{type(e).__name__}: {e}"
+                return ReplayedCall(
+                    call, time.perf_counter() - call_start, result, error
+                )
+
+        return await asyncio.gather(*(replay(call) for call in calls))
+
+
+def report(replayed: List[ReplayedCall]) -> None:
+    """Log a comparison of the recorded and replayed latencies and results."""
+    by_tool: Dict[str, List[ReplayedCall]] = {}
+    for call in replayed:
+        by_tool.setdefault(call.recorded.tool, []).append(call)
+
+    logger.info("\n=== Replay results ===")
+    for tool, tool_calls in sorted(by_tool.items()):
+        replayed_ms = [call.latency * 1000 for call in tool_calls]
+        recorded_ms = [
+            call.recorded.latency * 1000
+            for call in tool_calls
+            if call.recorded.latency is not None
+        ]
+        errors = sum(1 for call in tool_calls if call.error)
+        mismatches = sum(
+            1
+            for call in tool_calls
+            if call.error is None
+            and call.recorded.result is not None
+            and call.result != call.recorded.result
+        )
+
+        logger.info(f"{tool}: {len(tool_calls)} calls, {errors} errors")
+        if recorded_ms:
+            logger.info(
+                f"  recorded: p50={percentile(recorded_ms, 0.5):.2f} ms "
+                f"p95={percentile(recorded_ms, 0.95):.2f} ms "
+                f"max={max(recorded_ms):.2f} ms"
+            )
+        logger.info(
+            f"  replayed: p50={percentile(replayed_ms, 0.5):.2f} ms "
+            f"p95={percentile(replayed_ms, 0.95):.2f} ms "
+            f"max={max(replayed_ms):.2f} ms"
+        )
+        logger.info(f"  results differing from the recording: {mismatches}")
+
+
+def parse_speed(value: str) -> Optional[float]:
+    """Parse a --speed value: a positive multiplier or 'max'."""
+    if value == "max":
+        return None
+    speed = float(value.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+async def main():
+    """Main function to replay a traffic log."""
+    parser = argparse.ArgumentParser(description="Replay a captured MCP traffic log.")
+    parser.add_argument("log", help="Traffic log written with MCP_TRAFFIC_LOG")
+    parser.add_argument("server", help="Path of the server script to replay against")
+    parser.add_argument(
+        "--speed",
+        type=parse_speed,
+        default=1.0,
+        help="Replay speed: a multiplier such as 1 or 10, or 'max' (default: 1)",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=16,
+        help="Maximum number of calls in flight (default: 16)",
+    )
+    args = parser.parse_args()
+
+    calls = load_calls(args.log)
+    if not calls:
+        logger.error(f"No tool calls found in {args.log}")
+        return
+    logger.info(f"Replaying {len(calls)} tool calls from {args.log}...")
+
+    replayed = await replay_calls(calls, args.server, args.speed, args.concurrency)
+    report(replayed)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
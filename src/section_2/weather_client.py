@@ -8,11 +8,15 @@ import json
 import logging
 import os
 import sys
+from collections.abc import Sequence
 from contextlib import AsyncExitStack
-from datetime import timedelta
 
-from mcp import ClientSession
-from mcp.client.stdio import StdioServerParameters, stdio_client
+from common import connect_session_pool, server_environment
+from mcp.client.stdio import StdioServerParameters
+from resilience import AdaptiveSession, ToolPolicy
+from response_cache import CachedClientSession, CachePolicy, ToolResponseCache
+from tracing import Tracer
+from traffic_capture import TrafficRecorder
 
 # Configure logging
 logging.basicConfig(
@@ -22,6 +26,46 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+class ColumnarForecast(Sequence):
+    """
+    The daily forecasts of a columnar forecast response.
+
+    Rows are only built when they are accessed, so callers that work on the
+    columns directly never pay for materializing them.
+    """
+
+    def __init__(self, columns, conditions, temperature_unit):
+        self.columns = columns
+        self.conditions = conditions
+        self.temperature_unit = temperature_unit
+
+    def __len__(self):
+        return len(self.columns["date"])
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        return {
+            "date": self.columns["date"][index],
+            "condition": self.conditions[self.columns["condition"][index]],
+            "temperature": self.columns["temperature"][index],
+            "temperature_unit": self.temperature_unit,
+            "precipitation_chance": self.columns["precipitation_chance"][index],
+        }
+
+    def __repr__(self):
+        return f"ColumnarForecast({len(self)} days, {self.temperature_unit})"
+
+
+def decode_forecast(result):
+    """Wrap the columns of a columnar forecast response so they read as rows."""
+    if isinstance(result, dict) and result.get("format") == "columnar":
+        result["forecast"] = ColumnarForecast(
+            result["forecast"], result["conditions"], result["temperature_unit"]
+        )
+    return result
+
+
 async def test_weather_server():
     """Test connecting to the MCP weather server and calling its tools."""
     logger.info("Starting weather client test...")
@@ -33,39 +77,57 @@ async def test_weather_server():
         # Set up the server parameters
         server_script_path = os.path.join("src", "section_2", "weather_server.py")
         server_params = StdioServerParameters(
-            command=sys.executable, args=[server_script_path], env=None
+            command=sys.executable, args=[server_script_path], env=server_environment()
         )
 
         logger.info(f"Connecting to weather server at {server_script_path}...")
 
-        # Connect to the server using stdio_client
-        stdio_transport = await exit_stack.enter_async_context(
-            stdio_client(server_params)
-        )
-        read_stream, write_stream = stdio_transport
+        # Set MCP_TRAFFIC_LOG to record every JSON-RPC message
+        recorder = TrafficRecorder.from_env("client")
+        if recorder is not None:
+            exit_stack.callback(recorder.close)
 
-        # Create the client session
-        client = await exit_stack.enter_async_context(
-            ClientSession(
-                read_stream, write_stream, read_timeout_seconds=timedelta(seconds=10)
-            )
+        # Set MCP_TRACE_FILE to trace the latency breakdown of every tool call
+        tracer = Tracer.from_env("weather_client")
+        exit_stack.callback(tracer.close)
+
+        # Connect a small pool of sessions so slow calls can be hedged
+        sessions = await connect_session_pool(
+            exit_stack, server_params, tracer, recorder
         )
 
-        # IMPORTANT: Initialize the session before making any tool calls
-        logger.info("Initializing the client session...")
-        await client.initialize()
+        # The weather tools only read data, so they can be retried and hedged
+        client = AdaptiveSession(
+            sessions,
+            policies={
+                "get_weather_forecast": ToolPolicy(idempotent=True),
+                "get_weather_alerts": ToolPolicy(idempotent=True),
+                "get_forecast_freshness": ToolPolicy(idempotent=True),
+            },
+        )
 
         # List available tools
         response = await client.list_tools()
         tools = response.tools
         logger.info(f"Connected to server with tools: {[tool.name for tool in tools]}")
 
+        # Forecasts for the same city are requested repeatedly, so cache them
+        # for a few minutes. Alerts are time-sensitive and always hit the server.
+        cache = ToolResponseCache(
+            {"get_weather_forecast": CachePolicy(ttl_seconds=300)},
+            max_entries=128,
+            persist_path=os.environ.get("MCP_CLIENT_CACHE_PATH"),
+            namespace=server_script_path,
+        )
+        exit_stack.callback(cache.close)
+        client = CachedClientSession(client, cache)
+
         # Helper function to extract JSON content from tool response
         def extract_json_content(response):
             # Get the first text content
             text_content = response.content[0].text
-            # Parse the JSON string
-            return json.loads(text_content)
+            # Parse the JSON string, keeping columnar forecasts as columns
+            return decode_forecast(json.loads(text_content))
 
         # 1. Test the weather forecast tool
         logger.info("\n=== Testing get_weather_forecast tool ===")
@@ -111,6 +173,33 @@ async def test_weather_server():
 
             logger.info("✅ Fahrenheit units test passed!")
 
+            # Test the columnar format on a long horizon
+            logger.info("\nTesting forecast with columnar format")
+            rows_response = await client.call_tool(
+                "get_weather_forecast", {"city": city, "days": 10}
+            )
+            columnar_response = await client.call_tool(
+                "get_weather_forecast", {"city": city, "days": 10, "format": "columnar"}
+            )
+            logger.info(
+                f"Payload size: {len(rows_response.content[0].text)} bytes as rows, "
+                f"{len(columnar_response.content[0].text)} bytes as columns"
+            )
+
+            columnar_result = extract_json_content(columnar_response)
+            logger.info(f"Columnar forecast result: {columnar_result}")
+            assert (
+                len(columnar_result["forecast"]) == 10
+            ), "Expected 10 days in forecast"
+            assert (
+                columnar_result["forecast"][0]["temperature_unit"] == "°C"
+            ), "Temperature unit should be °C"
+            assert set(columnar_result["forecast"][0]) == set(
+                extract_json_content(rows_response)["forecast"][0]
+            ), "Columnar rows should have the same fields as regular rows"
+
+            logger.info("✅ Columnar format test passed!")
+
             # Test with invalid city
             logger.info("\nTesting forecast with invalid city")
             invalid_city_response = await client.call_tool(
@@ -179,6 +268,23 @@ async def test_weather_server():
                 city_alerts = extract_json_content(city_alerts_response)
                 logger.info(f"{test_city} alerts: {city_alerts}")
 
+            # 4. Test the freshness of the precomputed forecasts
+            logger.info("\n=== Testing get_forecast_freshness tool ===")
+            freshness_response = await client.call_tool("get_forecast_freshness", {})
+            freshness = extract_json_content(freshness_response)
+            logger.info(f"Forecast freshness: {freshness}")
+
+            # With MCP_SHARED_FORECASTS, a follower serves the forecasts
+            # another server process materialized, without building any
+            if freshness["role"] != "follower":
+                assert freshness["generation"] >= 1, "Forecasts should be materialized"
+                assert freshness["last_build"], "Missing 'last_build' in freshness"
+            assert set(freshness["cities"]) >= set(
+                cities
+            ), "Every city should be materialized"
+
+            logger.info("✅ Forecast freshness tool test passed!")
+
             logger.info("\n=== All weather tool tests passed! ===")
 
         except asyncio.TimeoutError:
@@ -204,11 +310,9 @@ async def test_weather_server():
 async def main():
     """Main function to run the weather client tests."""
     try:
-        # Set a timeout for the entire test
-        await asyncio.wait_for(test_weather_server(), timeout=120.0)
+        # Every call is bounded by its own timeout, see AdaptiveSession
+        await test_weather_server()
         logger.info("Weather client test completed successfully!")
-    except asyncio.TimeoutError:
-        logger.error("Weather client test timed out after 120 seconds")
     except Exception as e:
         logger.exception(f"Error during weather client test: {e}")
         raise
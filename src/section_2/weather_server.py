@@ -5,11 +5,17 @@ This script demonstrates how to set up an MCP server with weather forecast and a
 
 import asyncio
 import logging
-import random
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 
+from admission import AdmissionController
+from forecast_materializer import ForecastMaterializer
+from forecast_provider import CITIES, FORECAST_DAYS, WEATHER_CONDITIONS, ForecastService
 from mcp.server.fastmcp import FastMCP
+from profiling import ToolProfiler
+from shared_forecasts import SharedForecastStore
+from stdio_transport import run_stdio
+from tracing import Tracer
+from traffic_capture import TrafficRecorder
 
 # Configure logging
 logging.basicConfig(
@@ -18,30 +24,23 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Define weather conditions
-WEATHER_CONDITIONS = [
-    "sunny",
-    "partly cloudy",
-    "cloudy",
-    "rainy",
-    "thunderstorm",
-    "snowy",
-    "foggy",
-    "windy",
-    "hail",
-]
-
-# Define cities with base temperatures
-CITIES = {
-    "New York": {"base_temp_c": 15, "precipitation_chance": 30},
-    "London": {"base_temp_c": 12, "precipitation_chance": 60},
-    "Tokyo": {"base_temp_c": 20, "precipitation_chance": 40},
-    "Sydney": {"base_temp_c": 25, "precipitation_chance": 20},
-    "Paris": {"base_temp_c": 18, "precipitation_chance": 35},
-    "Cairo": {"base_temp_c": 30, "precipitation_chance": 5},
-    "Moscow": {"base_temp_c": 5, "precipitation_chance": 25},
-    "Rio de Janeiro": {"base_temp_c": 27, "precipitation_chance": 15},
-}
+# Admission limits: server-wide concurrency and wait queue
+MAX_CONCURRENT_CALLS = 32
+MAX_QUEUED_CALLS = 64
+
+# Largest city name accepted by the weather tools
+MAX_CITY_PAYLOAD = 256
+
+# Largest request line read from stdin; the weather tools take small
+# arguments, so longer requests are rejected before being parsed
+MAX_REQUEST_BYTES = 64 * 1024
+
+# How often each materialized city forecast is refreshed, in seconds
+FORECAST_REFRESH_SECONDS = 60
+
+# Maximum age of the alerts returned, in seconds. Alerts are time-sensitive,
+# so they bypass the materialized forecasts and stale-while-revalidate
+ALERTS_MAX_AGE_SECONDS = 10
 
 
 def celsius_to_fahrenheit(celsius: float) -> float:
@@ -49,18 +48,31 @@ def celsius_to_fahrenheit(celsius: float) -> float:
     return (celsius * 9 / 5) + 32
 
 
-def get_weather_condition(precipitation_chance: int) -> str:
-    """Get a weather condition based on precipitation chance."""
-    if precipitation_chance < 10:
-        return random.choice(["sunny", "sunny", "sunny", "partly cloudy"])
-    elif precipitation_chance < 30:
-        return random.choice(["partly cloudy", "partly cloudy", "cloudy"])
-    elif precipitation_chance < 50:
-        return random.choice(["cloudy", "cloudy", "rainy"])
-    elif precipitation_chance < 70:
-        return random.choice(["rainy", "rainy", "thunderstorm"])
-    else:
-        return random.choice(["rainy", "thunderstorm", "thunderstorm"])
+def to_columnar(forecasts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Convert per-day forecast rows to parallel arrays.
+
+    The temperature unit is given once, and conditions are dictionary-encoded
+    as indices into the "conditions" list.
+    """
+    codes: Dict[str, int] = {}
+    columns: Dict[str, List[Any]] = {
+        "date": [],
+        "condition": [],
+        "temperature": [],
+        "precipitation_chance": [],
+    }
+    for row in forecasts:
+        columns["date"].append(row["date"])
+        columns["condition"].append(codes.setdefault(row["condition"], len(codes)))
+        columns["temperature"].append(row["temperature"])
+        columns["precipitation_chance"].append(row["precipitation_chance"])
+
+    return {
+        "temperature_unit": forecasts[0]["temperature_unit"] if forecasts else None,
+        "conditions": list(codes),
+        "forecast": columns,
+    }
 
 
 async def main():
@@ -72,11 +84,56 @@ async def main():
     # Initialize the MCP server with a name
     server = FastMCP("Weather MCP Server")
 
+    # Bound the work the server accepts so that floods degrade gracefully
+    admission = AdmissionController(
+        max_concurrent=MAX_CONCURRENT_CALLS, max_queued=MAX_QUEUED_CALLS
+    )
+
+    # Profile every tool invocation when MCP_PROFILE_DIR is set
+    profiler = ToolProfiler.from_env()
+
+    # Trace the latency breakdown of tool calls when MCP_TRACE_FILE is set
+    tracer = Tracer.from_env("weather_server")
+
+    # Forecasts come from the service at MCP_FORECAST_URL, or synthetic data.
+    # Lookups are batched and cached with stale-while-revalidate.
+    forecast_service = ForecastService.from_env()
+
+    # Set MCP_SHARED_FORECASTS to share forecasts with the other server
+    # processes on this host through a memory-mapped file
+    shared_forecasts = SharedForecastStore.from_env(
+        list(CITIES), WEATHER_CONDITIONS, FORECAST_DAYS
+    )
+
+    # Precompute every city's forecast in the background, so that tool calls
+    # are lookups; rebuilt on day rollover and refreshed city by city. With a
+    # shared store, only one server process materializes into it.
+    materializer = ForecastMaterializer(
+        forecast_service.provider,
+        list(CITIES),
+        refresh_seconds=FORECAST_REFRESH_SECONDS,
+        shared_store=shared_forecasts,
+    )
+
+    async def get_forecast_days(city: str, days: int) -> Optional[List[Dict]]:
+        """Get at least `days` daily forecasts: materialized, or fetched."""
+        weather = materializer.lookup(city)
+        if weather is not None and len(weather["days"]) >= days:
+            return weather["days"]
+
+        # Not materialized yet: fetch without publishing, only the process
+        # materializing the shared forecasts writes them
+        weather = await forecast_service.get(city)
+        return weather["days"] if weather is not None else None
+
     # Register a weather forecast tool
     @server.tool()
+    @tracer.trace
+    @profiler.profile
+    @admission.limit(max_concurrent=8, max_queued=32, max_payload=MAX_CITY_PAYLOAD)
     async def get_weather_forecast(
-        city: str, days: int = 3, units: str = "celsius"
-    ) -> Dict[str, Union[str, List[Dict[str, Union[str, float]]]]]:
+        city: str, days: int = 3, units: str = "celsius", format: str = "rows"
+    ) -> Dict[str, Any]:
         """
         Get a weather forecast for a specified city and number of days.
 
@@ -84,9 +141,11 @@ async def main():
             city: The name of the city to get the forecast for
             days: The number of days to forecast (default: 3)
             units: Temperature units, either 'celsius' or 'fahrenheit' (default: celsius)
+            format: Either 'rows' for a list of daily forecasts, or 'columnar'
+                for parallel arrays with dictionary-encoded conditions (default: rows)
 
         Returns:
-            A dictionary containing the city name and a list of daily forecasts
+            A dictionary containing the city name and the daily forecasts
         """
         logger.info(
             f"Generating weather forecast for {city} for {days} days in {units}"
@@ -105,19 +164,17 @@ async def main():
         if units not in ["celsius", "fahrenheit"]:
             return {"error": "Units must be either 'celsius' or 'fahrenheit'"}
 
-        # Generate forecasts
-        city_data = CITIES[city]
-        base_temp_c = city_data["base_temp_c"]
-        precipitation_chance = city_data["precipitation_chance"]
+        if format not in ["rows", "columnar"]:
+            return {"error": "Format must be either 'rows' or 'columnar'"}
 
-        forecasts = []
-        for day_offset in range(days):
-            date = datetime.now() + timedelta(days=day_offset)
-            date_str = date.strftime("%Y-%m-%d")
+        # Look up the city's forecast (materialized, shared store, then upstream)
+        forecast_days = await get_forecast_days(city, days)
+        if forecast_days is None:
+            return {"error": f"No forecast available for '{city}'"}
 
-            # Add some randomness to temperature
-            temp_variation = random.uniform(-5, 5)
-            temp_c = base_temp_c + temp_variation
+        forecasts = []
+        for day in forecast_days[:days]:
+            temp_c = day["temperature_c"]
 
             # Convert temperature if needed
             if units == "fahrenheit":
@@ -127,28 +184,26 @@ async def main():
                 temp = temp_c
                 temp_unit = "°C"
 
-            # Vary precipitation chance slightly
-            day_precipitation = max(
-                0, min(100, precipitation_chance + random.randint(-10, 10))
-            )
-
-            # Get weather condition
-            condition = get_weather_condition(day_precipitation)
-
             forecasts.append(
                 {
-                    "date": date_str,
-                    "condition": condition,
+                    "date": day["date"],
+                    "condition": day["condition"],
                     "temperature": round(temp, 1),
                     "temperature_unit": temp_unit,
-                    "precipitation_chance": day_precipitation,
+                    "precipitation_chance": day["precipitation_chance"],
                 }
             )
 
+        if format == "columnar":
+            return {"city": city, "format": "columnar", **to_columnar(forecasts)}
+
         return {"city": city, "forecast": forecasts}
 
     # Register a weather alert tool
     @server.tool()
+    @tracer.trace
+    @profiler.profile
+    @admission.limit(max_payload=MAX_CITY_PAYLOAD)
     async def get_weather_alerts(
         city: str,
     ) -> Dict[str, Union[str, List[Dict[str, str]]]]:
@@ -170,59 +225,45 @@ async def main():
                 "error": f"City '{city}' not found. Available cities: {available_cities}"
             }
 
-        # Generate alerts based on precipitation chance
-        city_data = CITIES[city]
-        precipitation_chance = city_data["precipitation_chance"]
-
-        alerts = []
-
-        # Generate random severe weather alerts
-        if precipitation_chance > 60:
-            alerts.append(
-                {
-                    "severity": "high",
-                    "type": "flood",
-                    "message": f"Flood warning in effect for {city} and surrounding areas",
-                }
-            )
-        elif precipitation_chance > 40:
-            alerts.append(
-                {
-                    "severity": "medium",
-                    "type": "rain",
-                    "message": f"Heavy rain expected in {city} today",
-                }
-            )
-
-        # Add a heat alert for very hot cities
-        if city_data["base_temp_c"] > 28:
-            alerts.append(
-                {
-                    "severity": "medium",
-                    "type": "heat",
-                    "message": f"Heat advisory in effect for {city}",
-                }
-            )
+        # Alerts must be recent: never served stale, refetched when too old
+        weather = await forecast_service.get(city, max_age=ALERTS_MAX_AGE_SECONDS)
+        if weather is None:
+            return {"error": f"No alerts available for '{city}'"}
 
-        # Add a cold alert for very cold cities
-        if city_data["base_temp_c"] < 8:
-            alerts.append(
-                {
-                    "severity": "medium",
-                    "type": "cold",
-                    "message": f"Cold weather advisory in effect for {city}",
-                }
-            )
+        return {"city": city, "alerts": weather["alerts"]}
 
-        # Sometimes return no alerts
-        if random.random() > 0.7:
-            alerts = []
+    # Register a tool reporting how fresh the materialized forecasts are
+    @server.tool()
+    @tracer.trace
+    @profiler.profile
+    @admission.limit()
+    async def get_forecast_freshness() -> Dict[str, Any]:
+        """
+        Get the freshness and timing of the precomputed forecasts.
 
-        return {"city": city, "alerts": alerts}
+        Returns:
+            A dictionary with the materialization generation, the last full
+            build and, per city, the forecast age and last refresh time
+        """
+        return materializer.stats()
 
     # Run the server using stdio
     logger.info("Weather Server started. Running with stdio communication.")
-    await server.run_stdio_async()
+    await materializer.start()
+    try:
+        # Set MCP_TRAFFIC_LOG to record every JSON-RPC message
+        await run_stdio(
+            server,
+            recorder=TrafficRecorder.from_env("server"),
+            observer=tracer.server_observer(),
+            max_request_bytes=MAX_REQUEST_BYTES,
+        )
+    finally:
+        await materializer.close()
+        await forecast_service.close()
+        if shared_forecasts is not None:
+            shared_forecasts.close()
+        tracer.close()
 
 
 if __name__ == "__main__":
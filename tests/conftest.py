@@ -0,0 +1,8 @@
+"""Make the section 2 modules importable the way the scripts import each other."""
+
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src", "section_2")
+)
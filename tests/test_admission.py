@@ -0,0 +1,102 @@
+"""Tests for server admission control and request size limits."""
+
+import asyncio
+
+import pytest
+from admission import (
+    AdmissionController,
+    ConcurrencyLimiter,
+    PayloadTooLargeError,
+    ServerOverloadedError,
+    payload_size,
+)
+from mcp import types
+from stdio_transport import oversized_request_error
+
+
+def test_limiter_rejects_when_the_queue_is_full():
+    async def scenario():
+        limiter = ConcurrencyLimiter("Test", max_concurrent=1, max_queued=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with limiter.acquire():
+                await release.wait()
+
+        running = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+        assert (limiter.active, limiter.queued) == (1, 1)
+
+        with pytest.raises(ServerOverloadedError, match="Test is overloaded"):
+            async with limiter.acquire():
+                pass
+        assert limiter.rejected == 1
+
+        release.set()
+        await asyncio.gather(running, queued)
+        assert (limiter.active, limiter.queued) == (0, 0)
+
+    asyncio.run(scenario())
+
+
+def test_tool_limit_rejects_calls_beyond_its_queue():
+    async def scenario():
+        admission = AdmissionController(max_concurrent=8, max_queued=8)
+        release = asyncio.Event()
+
+        @admission.limit(max_concurrent=1, max_queued=0)
+        async def slow_tool():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(slow_tool())
+        await asyncio.sleep(0)
+        with pytest.raises(ServerOverloadedError, match="Tool 'slow_tool'"):
+            await slow_tool()
+
+        release.set()
+        assert await first == "done"
+        assert admission.tool_limiters["slow_tool"].rejected == 1
+
+    asyncio.run(scenario())
+
+
+def test_payload_size_counts_strings_and_containers():
+    assert payload_size("abc") == 3
+    assert payload_size(["ab", "c"]) == 3 + 2
+    assert payload_size({"key": "value"}) == 8
+    assert payload_size(42) == 8
+
+
+def test_oversized_payload_is_rejected_before_the_tool_runs():
+    calls = []
+    admission = AdmissionController()
+
+    @admission.limit(max_payload=10)
+    async def echo(text: str) -> str:
+        calls.append(text)
+        return text
+
+    assert asyncio.run(echo(text="short")) == "short"
+    with pytest.raises(PayloadTooLargeError, match="exceeds the limit of 10"):
+        asyncio.run(echo(text="x" * 11))
+    assert calls == ["short"]
+
+
+def test_oversized_request_is_answered_with_its_id():
+    line = b'{"method":"tools/call","params":{"id":"inner"},"jsonrpc":"2.0","id":7}'
+    error = oversized_request_error(line[:20], line[-20:], len(line), 10)
+    assert isinstance(error.root, types.JSONRPCError)
+    assert error.root.id == 7
+    assert error.root.error.code == types.INVALID_REQUEST
+
+    line = b'{"jsonrpc":"2.0","id":"abc","method":"tools/call","params":{}}'
+    error = oversized_request_error(line[:40], line[-10:], len(line), 10)
+    assert error.root.id == "abc"
+
+
+def test_oversized_notification_gets_no_answer():
+    line = b'{"method":"notifications/progress","params":{"id":3},"jsonrpc":"2.0"}'
+    assert oversized_request_error(line[:40], line[-40:], len(line), 10) is None
@@ -0,0 +1,158 @@
+"""Tests for the precomputed forecasts and their leader/follower sharing."""
+
+import asyncio
+
+import pytest
+from forecast_materializer import ForecastMaterializer
+from forecast_provider import (
+    CITIES,
+    FORECAST_DAYS,
+    WEATHER_CONDITIONS,
+    ForecastProvider,
+    SyntheticForecastProvider,
+)
+from shared_forecasts import SharedForecastStore
+
+
+class FlakyProvider(ForecastProvider):
+    """Synthetic forecasts, malformed once `broken` is set."""
+
+    def __init__(self):
+        self.fetches = 0
+        self.broken = False
+
+    async def fetch(self, cities):
+        self.fetches += 1
+        fetched = await SyntheticForecastProvider().fetch(cities)
+        if self.broken:
+            # Chances a record can't hold, and a forecast without days
+            for weather in fetched.values():
+                for day in weather["days"]:
+                    day["precipitation_chance"] += 0.5
+            del fetched[cities[0]]["days"]
+        return fetched
+
+
+def make_store(tmp_path):
+    return SharedForecastStore(
+        str(tmp_path / "forecasts.bin"), list(CITIES), WEATHER_CONDITIONS, FORECAST_DAYS
+    )
+
+
+@pytest.fixture
+def open_store(tmp_path):
+    stores = []
+
+    def open_store():
+        stores.append(make_store(tmp_path))
+        return stores[-1]
+
+    yield open_store
+    for store in stores:
+        store.close()
+
+
+def test_private_lookup_and_stats():
+    async def scenario():
+        materializer = ForecastMaterializer(SyntheticForecastProvider(), list(CITIES))
+        assert materializer.lookup("London") is None
+        await materializer.build()
+
+        weather = materializer.lookup("London")
+        assert len(weather["days"]) == FORECAST_DAYS
+        assert weather["alerts"] is not None
+        assert materializer.lookup("Atlantis") is None
+
+        stats = materializer.stats()
+        assert stats["role"] == "private"
+        assert stats["generation"] == 1
+        assert stats["last_build"]["cities"] == len(CITIES)
+        assert set(stats["cities"]) == set(CITIES)
+        assert all("refresh_ms" in city for city in stats["cities"].values())
+
+    asyncio.run(scenario())
+
+
+def test_only_the_leader_materializes(open_store):
+    async def scenario():
+        providers = [FlakyProvider(), FlakyProvider()]
+        leader, follower = (
+            ForecastMaterializer(provider, list(CITIES), 60, open_store())
+            for provider in providers
+        )
+        await leader.start()
+        await follower.start()
+        try:
+            assert (leader.role, follower.role) == ("leader", "follower")
+            assert [provider.fetches for provider in providers] == [1, 0]
+
+            # The follower serves what the leader stored
+            assert follower.lookup("Paris") == leader.lookup("Paris")
+            assert follower.lookup("Paris")["days"]
+
+            stats = follower.stats()
+            assert (stats["generation"], stats["last_build"]) == (0, None)
+            assert set(stats["cities"]) == set(CITIES)
+            assert "refresh_ms" not in stats["cities"]["Paris"]
+        finally:
+            await leader.close()
+            await follower.close()
+
+    asyncio.run(scenario())
+
+
+def test_a_follower_takes_over_when_the_leader_leaves(tmp_path, open_store):
+    async def scenario():
+        leader_store = make_store(tmp_path)
+        leader = ForecastMaterializer(FlakyProvider(), list(CITIES), 60, leader_store)
+        follower = ForecastMaterializer(
+            FlakyProvider(), list(CITIES), 0.05, open_store()
+        )
+        await leader.start()
+        await follower.start()
+        await leader.close()
+        leader_store.close()
+
+        await asyncio.sleep(0.2)
+        try:
+            assert follower.role == "leader"
+            assert follower.generation >= 1
+        finally:
+            await follower.close()
+
+    asyncio.run(scenario())
+
+
+def test_full_rebuilds_bump_the_shared_generation(open_store):
+    async def scenario():
+        store = open_store()
+        materializer = ForecastMaterializer(FlakyProvider(), list(CITIES), 60, store)
+        await materializer.start()
+        generation = store.generation
+        await materializer.build()
+        assert store.generation == generation + 1
+        assert materializer.lookup("Tokyo") is not None
+        await materializer.close()
+
+    asyncio.run(scenario())
+
+
+def test_refresh_keeps_running_after_a_failed_store(open_store):
+    async def scenario():
+        provider = FlakyProvider()
+        materializer = ForecastMaterializer(provider, list(CITIES), 0.8, open_store())
+        await materializer.start()
+        provider.broken = True
+        await asyncio.sleep(0.35)
+        try:
+            assert not materializer._task.done()
+            # Unstorable forecasts are skipped, the earlier ones still serve
+            assert materializer.lookup("London") is not None
+            provider.broken = False
+            fetches = provider.fetches
+            await asyncio.sleep(0.25)
+            assert provider.fetches > fetches
+        finally:
+            await materializer.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,90 @@
+"""Tests for batched forecast lookups."""
+
+import asyncio
+
+import pytest
+from forecast_provider import BatchLoader, ForecastProvider, ForecastService
+
+
+def test_lookups_in_one_window_share_a_fetch():
+    fetched = []
+
+    async def fetch_many(keys):
+        fetched.append(list(keys))
+        return {key: key.upper() for key in keys if key != "missing"}
+
+    async def scenario():
+        loader = BatchLoader(fetch_many, window=0.01)
+        results = await asyncio.gather(
+            loader.load("a"), loader.load("b"), loader.load("a"), loader.load("missing")
+        )
+        assert results == ["A", "B", "A", None]
+        assert fetched == [["a", "b", "missing"]]
+        assert loader.batches == 1
+
+    asyncio.run(scenario())
+
+
+def test_full_batches_are_fetched_without_waiting():
+    fetched = []
+
+    async def fetch_many(keys):
+        fetched.append(list(keys))
+        return {key: key for key in keys}
+
+    async def scenario():
+        loader = BatchLoader(fetch_many, window=60, max_batch=2)
+        await asyncio.wait_for(
+            asyncio.gather(loader.load("a"), loader.load("b")), timeout=1
+        )
+        assert fetched == [["a", "b"]]
+
+    asyncio.run(scenario())
+
+
+def test_fetch_errors_reach_every_waiter():
+    attempts = []
+
+    async def fetch_many(keys):
+        attempts.append(list(keys))
+        if len(attempts) == 1:
+            raise ConnectionError("upstream down")
+        return {key: key for key in keys}
+
+    async def scenario():
+        loader = BatchLoader(fetch_many, window=0.01)
+        results = await asyncio.gather(
+            loader.load("a"), loader.load("b"), return_exceptions=True
+        )
+        assert all(isinstance(result, ConnectionError) for result in results)
+
+        # Failed keys are not cached: the next lookup fetches again
+        assert await loader.load("a") == "a"
+        assert attempts == [["a", "b"], ["a"]]
+
+    asyncio.run(scenario())
+
+
+def test_forecast_provider_is_abstract():
+    with pytest.raises(TypeError):
+        ForecastProvider()
+
+
+def test_max_age_bypasses_stale_while_revalidate():
+    class CountingProvider(ForecastProvider):
+        def __init__(self):
+            self.fetches = 0
+
+        async def fetch(self, cities):
+            self.fetches += 1
+            return {city: {"city": city, "fetch": self.fetches} for city in cities}
+
+    async def scenario():
+        provider = CountingProvider()
+        service = ForecastService(provider, fresh_seconds=60, batch_window=0)
+        assert (await service.get("London"))["fetch"] == 1
+        assert (await service.get("London"))["fetch"] == 1
+        assert (await service.get("London", max_age=0))["fetch"] == 2
+        await service.close()
+
+    asyncio.run(scenario())
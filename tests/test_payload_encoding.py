@@ -0,0 +1,81 @@
+"""Tests for chunking and compressing large tool payloads."""
+
+import json
+
+import pytest
+from payload_encoding import (
+    COMPRESSION_MIN_SIZE,
+    choose_encoding,
+    decode_payload,
+    encode_payload,
+    parse_header,
+)
+
+LARGE_TEXT = "MCP moves large documents in chunks. " * (COMPRESSION_MIN_SIZE // 10)
+
+
+def test_small_text_is_returned_as_is():
+    assert encode_payload("hello") == "hello"
+    assert decode_payload(["hello"]) == "hello"
+
+
+def test_chunked_text_round_trips():
+    items = encode_payload("abcdefghij", chunk_size=4)
+    assert parse_header(items[0]) == {
+        "payload": "chunked",
+        "encoding": "identity",
+        "chunks": 3,
+        "length": 10,
+    }
+    assert items[1:] == ["abcd", "efgh", "ij"]
+    assert decode_payload(items) == "abcdefghij"
+
+
+def test_text_that_looks_like_a_header_is_wrapped():
+    text = json.dumps({"payload": "chunked", "encoding": "identity", "chunks": 0})
+    items = encode_payload(text)
+    assert isinstance(items, list)
+    assert decode_payload(items) == text
+
+
+def test_zlib_round_trips():
+    items = encode_payload(LARGE_TEXT, accept_encoding="zlib")
+    header = parse_header(items[0])
+    assert header["encoding"] == "zlib"
+    assert sum(len(item) for item in items[1:]) < len(LARGE_TEXT)
+    assert decode_payload(items) == LARGE_TEXT
+
+
+def test_compressed_chunks_round_trip():
+    items = encode_payload(LARGE_TEXT, chunk_size=1000, accept_encoding="zlib")
+    assert parse_header(items[0])["chunks"] == len(items) - 1 > 1
+    assert decode_payload(items) == LARGE_TEXT
+
+
+def test_small_text_is_never_compressed():
+    assert encode_payload("hello", accept_encoding="zlib") == "hello"
+
+
+def test_choose_encoding_follows_client_preference():
+    assert choose_encoding("br, zlib") == "zlib"
+    assert choose_encoding("br, gzip") is None
+    assert choose_encoding("") is None
+
+
+def test_missing_chunks_are_rejected():
+    items = encode_payload("abcdefghij", chunk_size=4)
+    with pytest.raises(ValueError, match="Expected 3 payload chunks, got 2"):
+        decode_payload(items[:-1])
+
+
+def test_truncated_payload_is_rejected():
+    items = encode_payload("abcdefghij", chunk_size=4)
+    items[-1] = "i"
+    with pytest.raises(ValueError, match="Expected a payload of 10 characters"):
+        decode_payload(items)
+
+
+def test_unsupported_encoding_is_rejected():
+    header = {"payload": "chunked", "encoding": "br", "chunks": 1, "length": 1}
+    with pytest.raises(ValueError, match="Unsupported payload encoding"):
+        decode_payload([json.dumps(header), "AA=="])
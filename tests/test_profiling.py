@@ -0,0 +1,57 @@
+"""Tests for per-tool profiling."""
+
+import asyncio
+import json
+import tracemalloc
+
+from admission import AdmissionController
+from profiling import ToolProfiler
+
+
+def test_disabled_profiling_leaves_tools_unchanged():
+    async def tool():
+        return 1
+
+    assert ToolProfiler(None).profile(tool) is tool
+
+
+def test_every_invocation_is_profiled(tmp_path):
+    profiler = ToolProfiler(str(tmp_path))
+
+    @profiler.profile
+    async def add(a: int, b: int) -> int:
+        return a + b
+
+    try:
+        assert asyncio.run(add(a=1, b=2)) == 3
+    finally:
+        tracemalloc.stop()
+
+    (summary,) = [
+        json.loads(line) for line in (tmp_path / "profile_summary.jsonl").open()
+    ]
+    assert summary["tool"] == "add"
+    assert summary["arguments"] == "{'a': 1, 'b': 2}"
+    assert (tmp_path / f"{summary['profile']}").exists()
+    assert (tmp_path / f"{summary['folded']}").exists()
+
+
+def test_profiled_calls_wait_without_holding_admission_slots(tmp_path):
+    profiler = ToolProfiler(str(tmp_path))
+    admission = AdmissionController(max_concurrent=8)
+
+    # The order of the servers: waiting for the profiler happens outside
+    # admission control, so a single-slot tool with no queue serves both calls
+    @profiler.profile
+    @admission.limit(max_concurrent=1, max_queued=0)
+    async def slow() -> str:
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def scenario():
+        return await asyncio.gather(slow(), slow())
+
+    try:
+        assert asyncio.run(scenario()) == ["done", "done"]
+    finally:
+        tracemalloc.stop()
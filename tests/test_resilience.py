@@ -0,0 +1,110 @@
+"""Tests for adaptive timeouts, hedged requests and the retry budget."""
+
+import asyncio
+
+import pytest
+from resilience import (
+    HEDGE_META_KEY,
+    AdaptiveSession,
+    LatencyTracker,
+    RetryBudget,
+    ToolPolicy,
+)
+
+
+class FakeSession:
+    """A session answering every call after a delay, recording the calls."""
+
+    def __init__(self, name, delay=0.0):
+        self.name = name
+        self.delay = delay
+        self.calls = []
+
+    async def call_tool(self, name, arguments=None, meta=None):
+        self.calls.append((name, arguments, meta))
+        await asyncio.sleep(self.delay)
+        return self.name
+
+
+def make_client(sessions, **kwargs):
+    tracker = LatencyTracker()
+    for _ in range(5):
+        tracker.record("slow", 0.01)
+    return AdaptiveSession(
+        sessions,
+        policies={"slow": ToolPolicy(idempotent=True)},
+        tracker=tracker,
+        budget=RetryBudget(initial_tokens=10),
+        **kwargs,
+    )
+
+
+def test_hedges_go_to_another_session_than_the_primary():
+    async def scenario():
+        sessions = [FakeSession("a", delay=0.1), FakeSession("b", delay=0.1)]
+        client = make_client(sessions)
+        await asyncio.gather(
+            client.call_tool("slow", {"call": 0}), client.call_tool("slow", {"call": 1})
+        )
+
+        assert client.hedges_sent == 2
+        for session in sessions:
+            # One primary and one hedge, each for a different call
+            assert [meta for _, _, meta in session.calls] == [
+                None,
+                {HEDGE_META_KEY: True},
+            ]
+            assert len({arguments["call"] for _, arguments, _ in session.calls}) == 2
+
+    asyncio.run(scenario())
+
+
+def test_a_single_session_never_hedges():
+    async def scenario():
+        session = FakeSession("a", delay=0.05)
+        client = make_client([session])
+        assert await client.call_tool("slow") == "a"
+        assert client.hedges_sent == 0
+        assert len(session.calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_non_idempotent_tools_are_neither_hedged_nor_retried():
+    async def scenario():
+        sessions = [FakeSession("a", delay=0.2), FakeSession("b")]
+        client = make_client(sessions, max_timeout=0.05)
+        with pytest.raises(asyncio.TimeoutError):
+            await client.call_tool("write")
+        assert (client.hedges_sent, client.retries) == (0, 0)
+        assert len(sessions[0].calls) + len(sessions[1].calls) == 1
+
+    asyncio.run(scenario())
+
+
+def test_timeouts_follow_latency_and_payload_size():
+    client = AdaptiveSession(
+        [FakeSession("a")],
+        policies={"echo": ToolPolicy(adaptive_timeout=False, seconds_per_mb=1.0)},
+        min_timeout=0.5,
+        max_timeout=10.0,
+    )
+    assert client.timeout_for("add") == 10.0
+    for _ in range(5):
+        client.tracker.record("add", 0.01)
+    assert client.timeout_for("add") == 0.5
+
+    for _ in range(5):
+        client.tracker.record("echo", 0.01)
+    assert client.timeout_for("echo", {"text": "x" * 2 * 1024 * 1024}) == pytest.approx(
+        12.0
+    )
+
+
+def test_retry_budget_bounds_extra_requests():
+    budget = RetryBudget(ratio=0.5, initial_tokens=1, max_tokens=2)
+    assert budget.try_spend()
+    assert not budget.try_spend()
+    budget.record_request()
+    budget.record_request()
+    assert budget.try_spend()
@@ -0,0 +1,117 @@
+"""Tests for the client-side tool response cache."""
+
+import json
+import sqlite3
+
+from mcp.types import CallToolResult, TextContent
+from response_cache import CachePolicy, ToolResponseCache, is_error_response
+
+
+def result(payload, is_error=False):
+    return CallToolResult(
+        content=[TextContent(type="text", text=json.dumps(payload))],
+        isError=is_error,
+    )
+
+
+def test_entries_expire_after_their_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("response_cache.time.time", lambda: now[0])
+    cache = ToolResponseCache(
+        {"forecast": CachePolicy(ttl_seconds=60), "cities": CachePolicy(None)}
+    )
+    cache.put("forecast", {"city": "Paris"}, result({"temp": 18}))
+    cache.put("cities", None, result(["Paris"]))
+
+    now[0] += 59
+    assert cache.get("forecast", {"city": "Paris"}) is not None
+    now[0] += 2
+    assert cache.get("forecast", {"city": "Paris"}) is None
+    assert cache.get("cities", {}) is not None
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_only_allow_listed_successes_are_cached():
+    cache = ToolResponseCache({"forecast": CachePolicy()})
+    cache.put("forecast", {"city": "Atlantis"}, result({"error": "Unknown city"}))
+    cache.put("forecast", {"city": "Rome"}, result("boom", is_error=True))
+    cache.put("echo", {"text": "hi"}, result("hi"))
+
+    assert cache.get("forecast", {"city": "Atlantis"}) is None
+    assert cache.get("forecast", {"city": "Rome"}) is None
+    assert cache.get("echo", {"text": "hi"}) is None
+    assert is_error_response(result({"error": "Unknown city"}))
+    assert not is_error_response(result({"temp": 18}))
+
+
+def test_the_least_recently_used_entry_is_evicted():
+    cache = ToolResponseCache({"forecast": CachePolicy()}, max_entries=2)
+    for city in ("Paris", "Rome"):
+        cache.put("forecast", {"city": city}, result(city))
+    cache.get("forecast", {"city": "Paris"})
+    cache.put("forecast", {"city": "Oslo"}, result("Oslo"))
+
+    assert cache.get("forecast", {"city": "Rome"}) is None
+    assert cache.get("forecast", {"city": "Paris"}) is not None
+    assert cache.get("forecast", {"city": "Oslo"}) is not None
+
+
+def test_persisted_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ToolResponseCache({"forecast": CachePolicy()}, persist_path=path)
+    cache.put("forecast", {"city": "Paris"}, result({"temp": 18}))
+    cache.close()
+
+    cache = ToolResponseCache({"forecast": CachePolicy()}, persist_path=path)
+    cached = cache.get("forecast", {"city": "Paris"})
+    assert cached.model_dump() == result({"temp": 18}).model_dump()
+    # Namespaces keep the entries of different servers apart
+    other = ToolResponseCache(
+        {"forecast": CachePolicy()}, persist_path=path, namespace="other"
+    )
+    assert other.get("forecast", {"city": "Paris"}) is None
+    cache.close()
+    other.close()
+
+
+def test_the_persistent_file_is_bounded_too(tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ToolResponseCache(
+        {"forecast": CachePolicy()}, max_entries=2, persist_path=path
+    )
+    for city in ("Paris", "Rome", "Oslo"):
+        cache.put("forecast", {"city": city}, result(city))
+    cache.close()
+
+    rows = sqlite3.connect(path).execute("SELECT key FROM responses").fetchall()
+    assert sorted(json.loads(key)[2]["city"] for key, in rows) == ["Oslo", "Rome"]
+
+
+def test_files_without_last_used_are_upgraded(tmp_path):
+    path = str(tmp_path / "cache.db")
+    db = sqlite3.connect(path)
+    db.execute(
+        "CREATE TABLE responses ("
+        "key TEXT PRIMARY KEY, tool TEXT, expires_at REAL, payload TEXT)"
+    )
+    old = ToolResponseCache({"forecast": CachePolicy()}).make_key(
+        "forecast", {"city": "Paris"}
+    )
+    db.execute(
+        "INSERT INTO responses VALUES (?, ?, ?, ?)",
+        (old, "forecast", None, result("Paris").model_dump_json()),
+    )
+    db.commit()
+    db.close()
+
+    cache = ToolResponseCache(
+        {"forecast": CachePolicy()}, max_entries=1, persist_path=path
+    )
+    assert cache.get("forecast", {"city": "Paris"}) is not None
+    cache.put("forecast", {"city": "Rome"}, result("Rome"))
+    cache.close()
+
+    cache = ToolResponseCache({"forecast": CachePolicy()}, persist_path=path)
+    assert cache.get("forecast", {"city": "Paris"}) is None
+    assert cache.get("forecast", {"city": "Rome"}) is not None
+    cache.close()
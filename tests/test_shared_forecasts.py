@@ -0,0 +1,175 @@
+"""Tests for the memory-mapped forecast store shared between processes."""
+
+import os
+import struct
+import time
+from datetime import date, timedelta
+
+import pytest
+from shared_forecasts import HEADER, SharedForecastStore
+
+CITIES = ["London", "Paris"]
+CONDITIONS = ["sunny", "rainy"]
+DAYS = 3
+
+
+def make_days(count, start=None):
+    start = start or date.today()
+    return [
+        {
+            "date": (start + timedelta(days=i)).isoformat(),
+            "temperature_c": 10.5 + i,
+            "precipitation_chance": 20 + i,
+            "condition": CONDITIONS[i % 2],
+        }
+        for i in range(count)
+    ]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "forecasts.bin")
+
+
+@pytest.fixture
+def store(path):
+    store = SharedForecastStore(path, CITIES, CONDITIONS, DAYS)
+    yield store
+    store.close()
+
+
+def test_write_then_read_round_trips(store):
+    days = make_days(DAYS)
+    assert store.write("London", days)
+    assert store.read("London") == days
+    assert store.read("Paris") is None
+
+
+def test_read_pads_short_forecasts(store):
+    days = make_days(2)
+    assert store.write("London", days)
+    assert store.read("London") == days
+
+
+def test_rejects_records_that_do_not_fit(store):
+    assert not store.write("Berlin", make_days(DAYS))
+    bad_condition = make_days(DAYS)
+    bad_condition[1]["condition"] = "hail"
+    assert not store.write("London", bad_condition)
+    gap = make_days(DAYS)
+    del gap[1]
+    assert not store.write("London", gap)
+
+
+@pytest.mark.parametrize(
+    "field, value",
+    [
+        ("precipitation_chance", 20.5),
+        ("precipitation_chance", 256),
+        ("temperature_c", "warm"),
+        ("date", "tomorrow"),
+    ],
+)
+def test_rejects_values_records_cannot_hold(store, field, value):
+    days = make_days(DAYS)
+    days[0][field] = value
+    assert not store.write("London", days)
+    assert store.read("London") is None
+
+
+def test_rejects_missing_fields(store):
+    days = make_days(DAYS)
+    del days[1]["temperature_c"]
+    assert not store.write("London", days)
+
+
+def test_read_starts_today(store):
+    days = make_days(DAYS, date.today() - timedelta(days=1))
+    assert store.write("London", days)
+    assert store.read("London") == days[1:]
+
+
+def test_read_ignores_old_forecasts(store):
+    assert store.write("London", make_days(DAYS))
+    time.sleep(0.01)
+    assert store.read("London", max_age=0) is None
+    assert store.read("London", max_age=60) is not None
+
+
+def test_writes_are_visible_to_other_mappings(path, store):
+    other = SharedForecastStore(path, CITIES, CONDITIONS, DAYS)
+    try:
+        days = make_days(DAYS)
+        store.write("Paris", days)
+        assert other.read("Paris") == days
+    finally:
+        other.close()
+
+
+def test_read_gives_up_on_a_slot_being_written(store):
+    assert store.write("London", make_days(DAYS))
+    sequence = struct.unpack_from("<Q", store._map, HEADER.size)[0]
+    # An odd sequence means a writer is in the middle of updating the slot
+    struct.pack_into("<Q", store._map, HEADER.size, sequence + 1)
+    assert store.read("London") is None
+    struct.pack_into("<Q", store._map, HEADER.size, sequence + 2)
+    assert store.read("London") is not None
+
+
+def test_invalidate_bumps_the_generation(store):
+    assert store.write("London", make_days(DAYS))
+    generation = store.generation
+    store.invalidate()
+    assert store.generation == generation + 1
+    assert store.read("London") is None
+    assert store.fetched_at("London") is None
+
+    days = make_days(DAYS)
+    assert store.write("London", days)
+    assert store.read("London") == days
+
+
+def test_reopening_with_the_same_layout_keeps_the_data(path, store):
+    days = make_days(DAYS)
+    store.write("London", days)
+    reopened = SharedForecastStore(path, CITIES, CONDITIONS, DAYS)
+    try:
+        assert reopened.read("London") == days
+    finally:
+        reopened.close()
+
+
+def test_another_layout_uses_another_file(path, store):
+    days = make_days(DAYS)
+    store.write("London", days)
+
+    other = SharedForecastStore(path, CITIES, CONDITIONS, DAYS + 2)
+    try:
+        assert other.path != store.path
+        assert other.read("London") is None
+        assert other.write("London", make_days(DAYS + 2))
+        # The store of the first layout is left untouched
+        assert store.read("London") == days
+        assert os.path.getsize(store.path) == HEADER.size + 2 * store.slot_size
+    finally:
+        other.close()
+
+
+def test_refuses_a_file_of_another_layout(path, store):
+    with open(store.path, "r+b") as f:
+        f.write(b"NOTMAGIC")
+    with pytest.raises(ValueError, match="not a forecast store of this layout"):
+        SharedForecastStore(path, CITIES, CONDITIONS, DAYS)
+
+
+def test_only_one_store_claims_the_writer_lock(path):
+    first = SharedForecastStore(path, CITIES, CONDITIONS, DAYS)
+    second = SharedForecastStore(path, CITIES, CONDITIONS, DAYS)
+    try:
+        assert first.claim_writer()
+        assert first.claim_writer()
+        assert not second.claim_writer()
+        first.close()
+        assert second.claim_writer()
+    finally:
+        second.close()
@@ -0,0 +1,84 @@
+"""Tests for assembling and summarizing the spans of traced tool calls."""
+
+import logging
+
+from tracing import Tracer, load_trace, parse_traceparent, summarize
+
+TRACE_ID = "4bf92f3577b34da6a3ce929d0e0e4736"
+PARENT_ID = "00f067aa0ba902b7"
+
+
+def request_state(**stamps):
+    return {"trace_id": TRACE_ID, "parent_id": PARENT_ID, **stamps}
+
+
+def spans(path):
+    return {event["name"]: event for event in load_trace(path) if event["ph"] == "X"}
+
+
+def test_parse_traceparent():
+    assert parse_traceparent(f"00-{TRACE_ID}-{PARENT_ID}-01") == (TRACE_ID, PARENT_ID)
+    assert parse_traceparent("00-short-id-01") is None
+    assert parse_traceparent(None) is None
+
+
+def test_a_finished_request_records_every_server_span(tmp_path):
+    path = str(tmp_path / "trace.json")
+    tracer = Tracer(path, "server")
+    state = request_state(read=100.0, decoded=110.0, started=130.0, finished=180.0)
+    state["tool"] = "get_forecast"
+    tracer._finish_request(7, state, 200.0)
+    tracer.close()
+
+    recorded = spans(path)
+    assert {name: (span["ts"], span["dur"]) for name, span in recorded.items()} == {
+        "server decode": (100.0, 10.0),
+        "validate": (110.0, 20.0),
+        "execute": (130.0, 50.0),
+        "encode": (180.0, 20.0),
+    }
+    assert {span["tid"] for span in recorded.values()} == {7}
+    assert recorded["execute"]["args"] == {
+        "trace_id": TRACE_ID,
+        "parent_id": PARENT_ID,
+        "tool": "get_forecast",
+        "request_id": 7,
+    }
+
+
+def test_a_rejected_request_is_all_validation(tmp_path):
+    path = str(tmp_path / "trace.json")
+    tracer = Tracer(path, "server")
+    tracer._finish_request("abc", request_state(read=100.0, decoded=110.0), 150.0)
+    tracer.close()
+
+    recorded = spans(path)
+    assert set(recorded) == {"server decode", "validate"}
+    assert (recorded["validate"]["ts"], recorded["validate"]["dur"]) == (110.0, 40.0)
+    assert recorded["validate"]["args"]["tool"] is None
+
+
+def test_summarize_reports_every_span_per_tool(tmp_path, caplog):
+    path = str(tmp_path / "trace.json")
+    tracer = Tracer(path, "server")
+    for request_id, duration in enumerate((1000.0, 3000.0)):
+        state = request_state(read=0.0, decoded=10.0, started=20.0)
+        state.update(tool="add", finished=20.0 + duration)
+        tracer._finish_request(request_id, state, 40.0 + duration)
+    tracer.close()
+
+    with caplog.at_level(logging.INFO, logger="tracing"):
+        summarize(load_trace(path))
+
+    lines = [record.getMessage() for record in caplog.records]
+    assert lines[0].strip() == "=== add ==="
+    reported = [line.split()[0:2] for line in lines[1:]]
+    assert reported == [
+        ["server", "decode"],
+        ["validate", "n=2"],
+        ["execute", "n=2"],
+        ["encode", "n=2"],
+    ]
+    execute = next(line for line in lines if line.lstrip().startswith("execute"))
+    assert "mean=   2.000 ms" in execute
+    assert "p95=   3.000 ms" in execute
@@ -0,0 +1,100 @@
+"""Tests for reading recorded tool calls from a traffic log."""
+
+import json
+
+import pytest
+from resilience import HEDGE_META_KEY
+from traffic_replay import load_calls
+
+
+def call(id, name, arguments, meta=None):
+    params = {"name": name, "arguments": arguments}
+    if meta:
+        params["_meta"] = meta
+    return {"jsonrpc": "2.0", "id": id, "method": "tools/call", "params": params}
+
+
+def response(id, text):
+    return {"jsonrpc": "2.0", "id": id, "result": {"content": [{"text": text}]}}
+
+
+def write_log(tmp_path, entries):
+    path = tmp_path / "traffic.log"
+    path.write_text(
+        "".join(
+            json.dumps(dict(zip(("ts", "side", "conn", "dir", "msg"), entry))) + "\n"
+            for entry in entries
+        )
+    )
+    return str(path)
+
+
+def test_the_client_side_is_preferred(tmp_path):
+    path = write_log(
+        tmp_path,
+        [
+            (10.0, "server", "s1", "in", call(1, "add", {"a": 1})),
+            (10.0, "client", "c1", "out", call(1, "add", {"a": 1})),
+            (10.2, "server", "s1", "out", response(1, "1")),
+            (10.5, "client", "c1", "in", response(1, "1")),
+        ],
+    )
+    (recorded,) = load_calls(path)
+    assert recorded.latency == 0.5
+
+
+def test_server_only_logs_are_read_from_the_server_side(tmp_path):
+    path = write_log(
+        tmp_path,
+        [
+            (10.0, "server", "s1", "in", call(1, "add", {"a": 1})),
+            (10.2, "server", "s1", "out", response(1, "1")),
+        ],
+    )
+    (recorded,) = load_calls(path)
+    assert (recorded.tool, recorded.arguments) == ("add", {"a": 1})
+    assert recorded.latency == pytest.approx(0.2)
+    assert recorded.result == {"content": [{"text": "1"}]}
+
+
+def test_responses_are_paired_by_connection_and_id(tmp_path):
+    path = write_log(
+        tmp_path,
+        [
+            (5.0, "client", "c1", "out", call(1, "slow", {})),
+            (6.0, "client", "c2", "out", call(1, "fast", {})),
+            (6.0, "client", "c2", "in", {"jsonrpc": "2.0", "method": "notify"}),
+            (6.5, "client", "c2", "in", response(1, "fast")),
+            (8.0, "client", "c1", "in", response(1, "slow")),
+            (9.0, "client", "c1", "out", call(2, "lost", {})),
+        ],
+    )
+    calls = load_calls(path)
+    assert [(c.tool, c.offset, c.latency) for c in calls] == [
+        ("slow", 0.0, 3.0),
+        ("fast", 1.0, 0.5),
+        ("lost", 4.0, None),
+    ]
+    assert calls[1].result == {"content": [{"text": "fast"}]}
+    assert calls[2].result is None
+
+
+def test_hedged_requests_are_skipped(tmp_path):
+    path = write_log(
+        tmp_path,
+        [
+            (1.0, "client", "c1", "out", call(1, "forecast", {"city": "Paris"})),
+            (
+                1.1,
+                "client",
+                "c2",
+                "out",
+                call(1, "forecast", {"city": "Paris"}, {HEDGE_META_KEY: True}),
+            ),
+            (1.2, "client", "c2", "in", response(1, "hedge")),
+            (1.4, "client", "c1", "in", response(1, "primary")),
+        ],
+    )
+    (recorded,) = load_calls(path)
+    assert recorded.latency == pytest.approx(0.4)
+    assert recorded.result == {"content": [{"text": "primary"}]}